@@ -6,10 +6,33 @@ AWSClientManager - AWS クライアント初期化統合管理
 全ツール共通のAWS接続管理機能
 """
 
-import boto3
-from botocore.config import Config
+import time
 from botocore.exceptions import NoCredentialsError
 
+# BatchWriteItem の1リクエストあたり上限件数（BatchGetItem もこの単位でまとめる）
+DYNAMODB_BATCH_SIZE = 25
+# 未処理分（UnprocessedItems / UnprocessedKeys）の再送回数と初回待機秒（指数バックオフ）
+BATCH_RETRY_ATTEMPTS = 5
+BATCH_RETRY_BASE_DELAY = 0.5
+
+def send_dynamodb_batch(send, request_items: dict, unprocessed_key: str, on_response=None) -> dict:
+    """
+    DynamoDB のバッチ API（batch_write_item / batch_get_item）を未処理分がなくなるまで再送
+    - 再送前のみ指数バックオフで待機（最終試行の後は待たない）
+    - on_response 指定時は各レスポンスを渡す（BatchGetItem の取得結果の回収用）
+    Returns: BATCH_RETRY_ATTEMPTS 回送っても残った未処理分（全件処理時は空）
+    """
+    for attempt in range(BATCH_RETRY_ATTEMPTS):
+        if attempt:
+            time.sleep(BATCH_RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+        response = send(RequestItems=request_items)
+        if on_response:
+            on_response(response)
+        request_items = response.get(unprocessed_key) or {}
+        if not request_items:
+            break
+    return request_items
+
 class AWSClientManager:
     """AWS クライアント初期化統合管理クラス"""
     
@@ -19,10 +42,15 @@ class AWSClientManager:
         self.s3_client = None
         self.dynamodb = None
         self.dynamodb_table = None
+        # 低レベル DynamoDB クライアント（シリアライズ済みアイテムをそのまま送信する用途）
+        self.dynamodb_client = None
         self.lambda_client = None
     
     def setup_clients(self, include_lambda=False):
         """AWSクライアント初期化"""
+        # boto3 は読み込みが重いため、クライアント生成時に遅延インポート
+        import boto3
+        from botocore.config import Config
         try:
             aws_config = self.config['aws']
             
@@ -36,6 +64,7 @@ class AWSClientManager:
             self.s3_client = boto3.client('s3', region_name=aws_config['region'], config=boto_config)
             self.dynamodb = boto3.resource('dynamodb', region_name=aws_config['region'], config=boto_config)
             self.dynamodb_table = self.dynamodb.Table(aws_config['dynamodb_table'])
+            self.dynamodb_client = boto3.client('dynamodb', region_name=aws_config['region'], config=boto_config)
             
             # Lambda クライアント（必要に応じて）
             if include_lambda:
@@ -54,6 +83,8 @@ class AWSClientManager:
     
     def setup_register_clients(self):
         """登録ツール用AWSクライアント初期化"""
+        import boto3
+        from botocore.config import Config
         try:
             aws_config = self.config['aws']
             boto_config = Config(
@@ -79,6 +110,7 @@ class AWSClientManager:
     
     def setup_reviewer_clients(self, aws_region, s3_bucket, dynamodb_table):
         """検品ツール用AWSクライアント初期化"""
+        import boto3
         try:
             self.s3_client = boto3.client('s3', region_name=aws_region)
             self.dynamodb = boto3.resource('dynamodb', region_name=aws_region)
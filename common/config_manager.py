@@ -10,7 +10,6 @@ ConfigManager - 設定ファイル管理
 
 import os
 import yaml
-import boto3
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timezone, timedelta
 from .logger import ColorLogger
@@ -19,6 +18,12 @@ from botocore.exceptions import ClientError, NoCredentialsError
 # JST タイムゾーン定義（11スロット対応機能用）
 JST = timezone(timedelta(hours=9))
 
+# YAMLローダー（libyaml があれば C 実装を使用）
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 class ConfigManager:
     """設定ファイル管理クラス"""
 
@@ -127,7 +132,7 @@ class ConfigManager:
 
         try:
             with open(absolute_path, 'r', encoding='utf-8') as file:
-                data = yaml.safe_load(file)
+                data = yaml.load(file, Loader=YamlLoader)
             self.logger.print_success(f"✅ YAML読み込み成功: {filepath}")
             return data if data is not None else {}
 
@@ -226,6 +231,8 @@ class ConfigManager:
         """S3クライアントの初期化（遅延初期化）"""
         if self._s3_client is None:
             try:
+                # boto3 は読み込みが重いため、S3 を使う時点で遅延インポート
+                import boto3
                 self._s3_client = boto3.client('s3', region_name='ap-northeast-1')
                 self.logger.print_success("✅ S3クライアント初期化完了")
             except Exception as e:
@@ -341,7 +348,7 @@ class PostingScheduleManager:
             )
             
             config_content = response['Body'].read().decode('utf-8')
-            config = yaml.safe_load(config_content)
+            config = yaml.load(config_content, Loader=YamlLoader)
             
             # 基本検証
             self._validate_posting_schedule_config(config)
@@ -669,6 +676,7 @@ def get_posting_schedule_manager_standalone(
         PostingScheduleManagerインスタンス
     """
     try:
+        import boto3
         s3_client = boto3.client('s3', region_name=region)
         return PostingScheduleManager(
             s3_client=s3_client,
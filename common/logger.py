@@ -6,6 +6,8 @@ ColorLogger - シェルスクリプトのカラー出力完全再現
 全ツール共通のカラー出力ロガー
 """
 
+import sys
+
 class ColorLogger:
     """シェルスクリプトのカラー出力完全再現"""
     
@@ -18,27 +20,45 @@ class ColorLogger:
         self.CYAN = '\033[0;36m'
         self.MAGENTA = '\033[0;35m'
         self.NC = '\033[0m'  # No Color
+        
+        # 1件ごとの進捗ログを出力するか（False の場合、呼び出し側で文字列の組み立てごと省略する）
+        self.detailed = True
+        
+        # ログ種別ごとのプレフィックスを事前に組み立て（毎回の文字列結合を回避）
+        self._prefix_info = f"{self.BLUE}[INFO]{self.NC} "
+        self._prefix_success = f"{self.GREEN}[SUCCESS]{self.NC} "
+        self._prefix_warning = f"{self.YELLOW}[WARNING]{self.NC} "
+        self._prefix_error = f"{self.RED}[ERROR]{self.NC} "
+        self._prefix_stage = f"{self.CYAN}[STAGE]{self.NC} "
+        self._prefix_timing = f"{self.MAGENTA}[TIMING]{self.NC} "
+    
+    def _write(self, prefix, message):
+        """
+        1行を1回の write で出力
+        - print は本文と改行を別々に書き込むため、複数スレッドからの出力で行が混ざる
+        """
+        sys.stdout.write(f"{prefix}{message}\n")
     
     def print_status(self, message):
         """[INFO] メッセージ（青色）"""
-        print(f"{self.BLUE}[INFO]{self.NC} {message}")
+        self._write(self._prefix_info, message)
     
     def print_success(self, message):
         """[SUCCESS] メッセージ（緑色）"""
-        print(f"{self.GREEN}[SUCCESS]{self.NC} {message}")
+        self._write(self._prefix_success, message)
     
     def print_warning(self, message):
         """[WARNING] メッセージ（黄色）"""
-        print(f"{self.YELLOW}[WARNING]{self.NC} {message}")
+        self._write(self._prefix_warning, message)
     
     def print_error(self, message):
         """[ERROR] メッセージ（赤色）"""
-        print(f"{self.RED}[ERROR]{self.NC} {message}")
+        self._write(self._prefix_error, message)
     
     def print_stage(self, message):
         """[STAGE] メッセージ（シアン色）"""
-        print(f"{self.CYAN}[STAGE]{self.NC} {message}")
+        self._write(self._prefix_stage, message)
     
     def print_timing(self, message):
         """[TIMING] メッセージ（マゼンタ色）"""
-        print(f"{self.MAGENTA}[TIMING]{self.NC} {message}")
+        self._write(self._prefix_timing, message)
@@ -18,13 +18,14 @@ class ProcessTimer:
     
     def start(self, process_name="処理"):
         """時間計測開始"""
-        self.start_time = time.time()
+        # 経過時間の計測は単調増加クロックで行う（システム時刻の変更の影響を受けない）
+        self.start_time = time.perf_counter()
         self.process_name = process_name
     
     def mark_phase(self, phase_name):
         """フェーズマーク"""
         if self.start_time:
-            elapsed = time.time() - self.start_time
+            elapsed = time.perf_counter() - self.start_time
             self.phase_times[phase_name] = elapsed
     
     def end_and_report(self, success_count=None):
@@ -32,7 +33,7 @@ class ProcessTimer:
         if not self.start_time:
             return 0.0
         
-        total_time = time.time() - self.start_time
+        total_time = time.perf_counter() - self.start_time
         formatted_time = self.format_duration(total_time)
         
         self.logger.print_timing(f"⏱️ {self.process_name}完了時間: {formatted_time}")
@@ -6,6 +6,8 @@ Common types and data classes
 共通データクラスと型定義
 """
 
+import sys
+
 class GenerationType:
     """生成タイプクラス"""
     
@@ -14,10 +16,15 @@ class GenerationType:
         self.model_name = model_name
         self.prompt = prompt
         self.negative_prompt = negative_prompt
-        self.random_elements = random_elements or []
+        # 要素タイプ名は RandomElementGenerator 側の intern 済みキーと照合される
+        self.random_elements = [sys.intern(e) if isinstance(e, str) else e for e in random_elements or []]
         self.age_range = age_range or [18, 24]
         self.lora_settings = lora_settings or []
 
 class HybridGenerationError(Exception):
     """ハイブリッド生成専用エラー"""
     pass
+
+class CUDAOutOfMemoryError(HybridGenerationError):
+    """生成 API 側の CUDA メモリ不足エラー（メモリ回復後に再試行可能）"""
+    pass
@@ -74,6 +74,45 @@ class BedrockManager:
             self.logger.print_error(f"❌ Bedrock呼び出しエラー: {e}")
             return {}
 
+    def generate_all_timeslot_comments_batch(self, metadata_list: List[dict]) -> Dict[str, Dict[str, str]]:
+        """
+        複数画像の全時間帯コメントを1回のLambda呼び出しでまとめて生成
+        - 戻り値: imageId → コメント辞書（一括応答に含まれた画像のみ）
+        - 含まれなかった画像（一括モード非対応の Lambda・呼び出し失敗を含む）は呼び出し側で
+          generate_all_timeslot_comments により生成する（並行実行できるよう、ここではフォールバックしない）
+        """
+        if not metadata_list:
+            return {}
+
+        results = {}
+        try:
+            self.logger.print_status(f"🤖 Bedrock全時間帯コメント一括生成開始: {len(metadata_list)}件")
+
+            response = self.lambda_client.invoke(
+                FunctionName=self.lambda_function_name,
+                InvocationType='RequestResponse',
+                Payload=json.dumps({
+                    'generation_mode': 'all_timeslots_batch',
+                    'items': metadata_list
+                })
+            )
+
+            response_payload = json.loads(response['Payload'].read())
+            body = json.loads(response_payload['body'])
+
+            if body.get('success'):
+                for item in body.get('results', []):
+                    comments = item.get('all_comments')
+                    if item.get('imageId') and comments:
+                        results[item['imageId']] = comments
+                self.logger.print_success(f"🤖 Bedrock一括コメント生成完了: {len(results)}/{len(metadata_list)}件")
+            else:
+                self.logger.print_warning(f"⚠️ Bedrock一括生成失敗: {body.get('error')}")
+
+        except Exception as e:
+            self.logger.print_warning(f"⚠️ Bedrock一括呼び出しエラー: {e}")
+
+        return results
 
     def generate_single_comment(self, image_metadata: dict, time_slot: str) -> str:
         """単一時間帯コメント生成"""
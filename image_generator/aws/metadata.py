@@ -25,6 +25,7 @@ class MetadataManager:
         """
         self.config = config
         self.default_slots = default_slots
+        self.s3_bucket = config['aws']['s3_bucket']
         self.logger = ColorLogger()
 
     def prepare_metadata_and_dynamodb_item(self, final_image_path: str, index: int,
@@ -35,7 +36,9 @@ class MetadataManager:
         Returns: image_id, dynamodb_item
         """
         # �摜ID����
-        now = datetime.now(JST).strftime("%Y%m%d%H%M%S")
+        # 画像ごとに現在時刻を1回だけ取得し、ID用・ISO形式の両方に使う
+        now_dt = datetime.now(JST)
+        now = now_dt.strftime("%Y%m%d%H%M%S")
         fast_suffix = "_fast" if gen_type.fast_mode else ""
         ultra_suffix = "_ultra_safe"
         bedrock_suffix = "_bedrock" if gen_type.bedrock_enabled else ""
@@ -53,12 +56,12 @@ class MetadataManager:
         comment_ts = ""
         if hasattr(gen_type, 'bedrock_comments'):
             pre_comments = gen_type.bedrock_comments
-            comment_ts = datetime.now(JST).isoformat()
+            comment_ts = now_dt.isoformat()
 
         # DynamoDB �A�C�e��
         item = {
             "imageId": image_id,
-            "s3Bucket": self.config['aws']['s3_bucket'],
+            "s3Bucket": self.s3_bucket,
             "s3Key": s3_key,
             "genre": gen_type.name,
             "imageState": "unprocessed",
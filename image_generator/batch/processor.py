@@ -26,8 +26,8 @@ class BatchProcessor:
 
     def generate_hybrid_batch(self, genre: str, count: int) -> int:
         """指定ジャンルでバッチ実行"""
-        # ジャンル名に対応する GenerationType を探索
-        gt = next((g for g in self.generator.generation_types if g.name == genre), None)
+        # ジャンル名に対応する GenerationType を取得
+        gt = self.generator.generation_types_by_name.get(genre)
         if not gt:
             self.logger.print_error(f"未定義ジャンル: {genre}")
             return 0
@@ -35,13 +35,17 @@ class BatchProcessor:
         # generate_hybrid_imageメソッドを使用
         return self.generator.generate_hybrid_image(gt, count)
 
-    def generate_daily_hybrid_batch(self) -> None:
-        """日次バッチ呼び出し"""
+    def generate_daily_hybrid_batch(self, genres=None) -> int:
+        """
+        日次バッチ呼び出し
+        - genres: 対象ジャンル名のリスト（None で全ジャンル）
+        Returns: 成功枚数
+        """
         # 日次バッチ用の適切なメソッドを確認
         if hasattr(self.generator, 'generate_daily_batch'):
-            self.generator.generate_daily_batch()
+            return self.generator.generate_daily_batch(genres=genres)
         elif hasattr(self.generator, 'generate_daily_hybrid_batch'):
-            self.generator.generate_daily_hybrid_batch()
+            return self.generator.generate_daily_hybrid_batch()
         else:
             self.logger.print_error("日次バッチ用メソッドが見つかりません")
             # フォールバック：複数ジャンルで個別実行
@@ -53,3 +57,4 @@ class BatchProcessor:
                 total_success += success
                 
             self.logger.print_success(f"フォールバック日次バッチ完了: {total_success}件")
+            return total_success
@@ -14,15 +14,15 @@ import shutil
 import requests
 import json
 import yaml
-import torch
 import gc
 import urllib3
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from collections import deque, Counter
 from decimal import Decimal
 from datetime import datetime, timedelta, timezone
-from PIL import Image, ImageFilter, ImageEnhance
 from typing import TYPE_CHECKING
 
 from common.logger import ColorLogger
@@ -40,7 +40,7 @@ from ..randomization.image_pool import InputImagePool
 from ..randomization.element_generator import RandomElementGenerator
 from ..processing.image_processor import ImageProcessor
 from ..processing.generator_engine import GeneratorEngine
-from ..processing.saver import ImageSaver
+from ..processing.saver import ImageSaver, DynamoDBBatchWriter
 from ..memory.manager import MemoryManager
 from ..aws.bedrock_manager import BedrockManager
 from ..aws.metadata import MetadataManager
@@ -54,16 +54,31 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 # JST タイムゾーン
 JST = timezone(timedelta(hours=9))
 
+# ローカルモード用フォールバックコメント（11スロット、画像ごとに再構築せず複製して使用）
+FALLBACK_COMMENTS = {
+    'early_morning': "おはようございます！今日も素敵な一日になりそうです✨",
+    'morning': "今日もお仕事頑張ってください！応援しています📣",
+    'late_morning': "午前中お疲れ様！コーヒーブレイクでひと息つこう☕",
+    'lunch': "お昼休みですね！何か美味しいものを食べて午後も頑張りましょう🍽️",
+    'afternoon': "午後もお疲れ様！ティータイムで気分転換はいかが？🫖",
+    'pre_evening': "もうすぐ夕方ですね！今日一日もあと少し頑張って🌅",
+    'evening': "今日もお疲れ様でした！これからの予定はあるのかな？🌙",
+    'night': "今日もお疲れ様！夜の自分時間を大切に過ごしてね💆‍♀️",
+    'late_night': "深夜だけど今夜はどんな時間を過ごしてる？🌃",
+    'mid_night': "今日も一日お疲れ様でした！ゆっくり休んでおやすみなさい🌙✨",
+    'general': "素敵な時間をお過ごしください💫"
+}
+
 class HybridBijoImageGeneratorV7:
     """美少女画像SDXL統合生成クラス v7.0（11スロット対応版）"""
 
-    def __init__(self):
+    def __init__(self, config_path: str = 'config/config_v10.yaml'):
         self.logger = ColorLogger()
         self.logger.print_stage("🚀 SDXL統合生成ツール Ver7.0 初期化中...（11スロット対応版）")
 
-        # 設定読み込み
+        # 設定読み込み（ワーカーごとに WebUI・一時ディレクトリを分ける場合は別の設定ファイルを指定）
         cfg_mgr = ConfigManager(self.logger)
-        self.config = cfg_mgr.load_config(['config/config_v10.yaml'])
+        self.config = cfg_mgr.load_config([config_path])
 
         # ===============================================
         # bedrock_manager属性を最初に初期化（修正箇所）
@@ -105,6 +120,10 @@ class HybridBijoImageGeneratorV7:
         # メモリ管理（既存機能維持）
         self.memory_manager = MemoryManager(self.config)
 
+        # モデル管理（確認済みモデル・HTTPセッションを生成バッチ間で共有）
+        from .model_manager import ModelManager
+        self.model_manager = ModelManager(self.config)
+
         # プロンプト関連設定読み込み（既存機能維持）
         try:
             prompts_data = cfg_mgr.load_yaml(self.config['prompt_files']['prompts'])
@@ -117,6 +136,10 @@ class HybridBijoImageGeneratorV7:
             gen_types_data = {'generation_types': []}
 
         # 生成タイプ設定（既存機能維持）
+        # 全タイプ共通のフラグはループ外で1回だけ取得
+        fast_mode = self.config.get('fast_mode', {}).get('enabled', False)
+        bedrock_enabled = self.config.get('bedrock_features', {}).get('enabled', False)
+        ultra_safe_mode = self.config.get('memory_management', {}).get('enabled', False)
         self.generation_types = []
         for t in gen_types_data.get('generation_types', []):
             if t.get('name') in ['teen', 'jk']:
@@ -132,9 +155,9 @@ class HybridBijoImageGeneratorV7:
                 lora_settings=t.get('lora_settings', [])
             )
             
-            gt.fast_mode = self.config.get('fast_mode', {}).get('enabled', False)
-            gt.bedrock_enabled = self.config.get('bedrock_features', {}).get('enabled', False)
-            gt.ultra_safe_mode = self.config.get('memory_management', {}).get('enabled', False)
+            gt.fast_mode = fast_mode
+            gt.bedrock_enabled = bedrock_enabled
+            gt.ultra_safe_mode = ultra_safe_mode
             self.generation_types.append(gt)
 
         if not self.generation_types:
@@ -149,6 +172,13 @@ class HybridBijoImageGeneratorV7:
             )
             self.generation_types.append(default_gt)
 
+        # ジャンル名 → GenerationType（同名がある場合は先頭を優先）
+        self.generation_types_by_name = {}
+        for gt in self.generation_types:
+            self.generation_types_by_name.setdefault(gt.name, gt)
+        # メニュー表示用のジャンル名一覧（定義順）
+        self.genre_names = [gt.name for gt in self.generation_types]
+
         # 各種マネージャ初期化（既存機能維持）
         self.prompt_builder = PromptBuilder(self.config, prompts_data, gen_types_data)
         self.lora_manager = LoRAManager()
@@ -164,6 +194,31 @@ class HybridBijoImageGeneratorV7:
         self.temp_dir = self.config.get('temp_files', {}).get('directory', '/tmp/sdprocess')
         os.makedirs(self.temp_dir, exist_ok=True)
 
+        # 画像前処理（リサイズ用バッファを画像間で再利用、ポーズモードは画像ごとに更新）
+        self.image_processor = ImageProcessor(self.config, self.temp_dir, 'detection')
+
+        # 生成エンジン（ControlNet・ADetailer 引数テンプレートを画像間で再利用、ポーズモードは画像ごとに更新）
+        self.generator_engine = GeneratorEngine(self.config, 'detection', self.logger)
+
+        # 次の画像の入力準備（選択・リサイズ・Base64）を API 待ち中に先行実行するワーカー
+        self._input_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="input_prefetch")
+        self._pending_input = None  # (pose_mode, Future)
+
+        # 画像保存（DynamoDB アイテムの固定部分を画像間で再利用、DynamoDB 登録先は画像ごとに更新）
+        self.image_saver = ImageSaver(self.config, self.aws, self.temp_dir,
+                                      local_mode=self.config.get('local_execution', {}).get('enabled', True))
+
+        # Bedrock コメント生成（Lambda 呼び出し）を画像生成と並行して実行するワーカー
+        self._comment_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bedrock_comments")
+
+        # バッチ中の DynamoDB 登録用 DynamoDBBatchWriter（AWS保存時のみ、バッチ外では None）
+        self._dynamodb_writer = None
+
+        # AWS保存（S3 アップロード → DynamoDB 登録キュー追加）を次の画像の生成と並行して実行するワーカー
+        # DynamoDBBatchWriter はスレッドセーフではないため、登録は常にこの1スレッドから行う
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aws_save")
+        self._pending_saves = []
+
         # ===============================================
         # BedrockManager初期化（修正箇所）
         # ===============================================
@@ -260,9 +315,11 @@ class HybridBijoImageGeneratorV7:
 
         return metadata
 
-    def generate_hybrid_image(self, gen_type: GenerationType, count: int = 1) -> int:
+    def generate_hybrid_image(self, gen_type: GenerationType, count: int = 1,
+                              prefetch_after: bool = False) -> int:
         """
         ハイブリッド画像生成（メモリ管理強化版）
+        - prefetch_after: 後続のバッチ（日次バッチの次ジャンル）がある場合、最後の画像の生成中に次の入力を先行準備
         """
         overall_timer = ProcessTimer(self.logger)
         overall_timer.start(f"SDXL統合画像生成バッチ（{count}枚）- メモリ管理強化版")
@@ -273,60 +330,124 @@ class HybridBijoImageGeneratorV7:
 
         # 既存のモデル管理機能（完全保持）
         try:
-            from .model_manager import ModelManager
-            ModelManager(self.config).ensure_model_for_generation_type(gen_type)
+            self.model_manager.ensure_model_for_generation_type(gen_type)
         except HybridGenerationError as e:
             self.logger.print_error(f"❌ モデル切替失敗: {e}")
             return 0
 
         success = 0
-        for i in range(count):
-            img_timer = ProcessTimer(self.logger)
-            img_timer.start(f"画像{i+1}/{count}")
-            
-            try:
-                # ★ 追加: 各生成前にメモリチェック
-                if i > 0:  # 初回はバッチ開始時にチェック済み
-                    self.memory_manager.check_memory_usage()
-
-                # メモリセーフ実行で生成
-                path, response = self._generate_single_with_memory_safety(gen_type, i)
-                success += 1
-                
-                # ★ 追加: 3回に1回は積極的クリーンアップ
-                if i > 0 and i % 3 == 0:
-                    self.logger.print_status("🧹 定期メモリクリーンアップ実行")
-                    self.memory_manager.perform_aggressive_memory_cleanup()
-                
-                img_timer.end_and_report(1)
+        with self._dynamodb_batch_writer():
+            for i in range(count):
+                img_timer = ProcessTimer(self.logger)
+                img_timer.start(f"画像{i+1}/{count}")
                 
-            except Exception as e:
-                self.logger.print_error(f"❌ 生成エラー: {e}")
-                # ★ 追加: エラー時もメモリクリーンアップ
                 try:
-                    self.logger.print_status("🧹 エラー発生時メモリクリーンアップ")
-                    self.memory_manager.perform_aggressive_memory_cleanup()
-                except Exception as cleanup_error:
-                    self.logger.print_warning(f"⚠️ エラー時メモリクリーンアップ失敗: {cleanup_error}")
-                break
-
-        # ★ 追加: バッチ完了後の最終クリーンアップ
-        try:
-            self.logger.print_status("🧹 バッチ完了後最終クリーンアップ実行")
-            self.memory_manager.perform_aggressive_memory_cleanup()
-        except Exception as e:
-            self.logger.print_warning(f"⚠️ 最終クリーンアップエラー: {e}")
+                    # ★ 追加: 各生成前にメモリチェック
+                    if i > 0:  # 初回はバッチ開始時にチェック済み
+                        self.memory_manager.check_memory_usage()
+
+                    # メモリセーフ実行で生成（後続の画像がある場合は次の入力を先行準備）
+                    path, response = self._generate_single_with_memory_safety(
+                        gen_type, i, prefetch_next=prefetch_after or i < count - 1)
+                    success += 1
+                    # 画像ごとの軽量クリーンアップは execute_with_ultra_memory_safety 内で実行済み
+                    
+                    img_timer.end_and_report(1)
+                    
+                except Exception as e:
+                    self.logger.print_error(f"❌ 生成エラー: {e}")
+                    # WebUI 側の再起動・モデル変更の可能性があるため、次回はモデルを実際に確認
+                    self.model_manager.invalidate_model_cache()
+                    # ★ 追加: エラー時もメモリクリーンアップ
+                    try:
+                        self.logger.print_status("🧹 エラー発生時メモリクリーンアップ")
+                        self.memory_manager.perform_aggressive_memory_cleanup()
+                    except Exception as cleanup_error:
+                        self.logger.print_warning(f"⚠️ エラー時メモリクリーンアップ失敗: {cleanup_error}")
+                    break
+
+        # 後続バッチがなければ、使われなかった先行準備を破棄
+        if not prefetch_after:
+            self._discard_pending_input()
+
+        # 最終画像の直後に軽量クリーンアップ済み（エラー中断時は積極的クリーンアップ済み）のため、ここでは再実行しない
 
         overall_timer.end_and_report(success)
         self.logger.print_stage(f"=== 完了: {success}/{count} 枚（メモリ管理強化版） ===")
         return success
 
-    def _generate_single_with_memory_safety(self, gen_type: GenerationType, index: int):
+    def _discard_pending_input(self):
+        """使われなかった入力の先行準備を完了まで待って破棄（共有バッファの競合防止、次回は改めて選択）"""
+        pending, self._pending_input = self._pending_input, None
+        if pending:
+            try:
+                pending[1].result()
+            except Exception as e:
+                self.logger.print_warning(f"⚠️ 入力先行準備エラー: {e}")
+
+    def close(self):
+        """
+        バックグラウンドワーカーを停止（使い終わった生成器ごとに呼び出す、複数回呼び出し可）
+        - 使われなかった入力の先行準備は破棄する
+        - 実行中・待機中の AWS 保存は完了を待ってから停止する（途中で例外が出たバッチの保存も取りこぼさない）
+        """
+        self._discard_pending_input()
+        self._wait_pending_saves()
+        for executor in (self._input_prefetcher, self._comment_executor, self._save_executor):
+            executor.shutdown(wait=True)
+
+    @contextmanager
+    def _dynamodb_batch_writer(self):
+        """
+        AWS保存時はバッチ内の DynamoDB 登録を DynamoDBBatchWriter にまとめ、終了時に残りを送信する
+        - 低レベルクライアントで送信するため、アイテムは ImageSaver 側でシリアライズ済みのものを渡す
+        - 終了時はバックグラウンドの保存処理の完了を待ってから送信し、登録できなかった件数を報告する
+        """
+        client = getattr(self.aws, 'dynamodb_client', None) if self.aws else None
+        if client is None or self.config.get('local_execution', {}).get('enabled', True):
+            try:
+                yield
+            finally:
+                self._wait_pending_saves()
+            return
+        writer = DynamoDBBatchWriter(client, self.config['aws']['dynamodb_table'], self.logger)
+        self._dynamodb_writer = writer
+        try:
+            yield
+        finally:
+            self._wait_pending_saves()
+            self._dynamodb_writer = None
+            writer.flush()
+            if writer.failed_ids:
+                self.logger.print_error(f"❌ DynamoDB 未登録: {len(writer.failed_ids)}件 "
+                                        f"(S3 アップロード済み: {', '.join(writer.failed_ids)})")
+            else:
+                self.logger.print_success("✅ DynamoDB 一括登録完了")
+
+    def _wait_pending_saves(self):
+        """バックグラウンドで実行中の AWS 保存処理の完了を待つ"""
+        pending, self._pending_saves = self._pending_saves, []
+        if not pending:
+            return
+        self.logger.print_status(f"⏳ AWS保存の完了待ち: {len(pending)}件")
+        failed = 0
+        for future in pending:
+            try:
+                if not future.result():
+                    failed += 1
+            except Exception as e:
+                self.logger.print_error(f"❌ AWS保存エラー: {e}")
+                failed += 1
+        if failed:
+            self.logger.print_warning(f"⚠️ AWS保存失敗: {failed}/{len(pending)}件")
+
+    def _generate_single_with_memory_safety(self, gen_type: GenerationType, index: int,
+                                            prefetch_next: bool = False):
         """
         メモリセーフ実行でラップされた単発生成
         """
         def _safe_generation():
-            return self._generate_single(gen_type, index)
+            return self._generate_single(gen_type, index, prefetch_next=prefetch_next)
         
         # メモリ管理付きで生成実行
         return self.memory_manager.execute_with_ultra_memory_safety(
@@ -334,27 +455,11 @@ class HybridBijoImageGeneratorV7:
             f"画像生成_{index+1}"
         )
 
-    def _generate_single(self, gen_type: GenerationType, index: int):
+    def _prepare_input(self, pose_mode: str):
         """
-        単発生成ワークフロー（ポーズモード対応修正版 + メモリ管理強化）
+        入力画像の選択と前処理（ポーズ検出モードのみリサイズ・Base64化）
+        Returns: (input_path, input_b64)
         """
-        # ===============================================
-        # 既存の入力画像選択ロジック（修正版）
-        # ===============================================
-        if not self.input_pool:
-            cfg = self.config.get('input_images', {})
-            source_dir = cfg.get('source_directory', '/tmp/input')
-            formats = cfg.get('supported_formats', ['jpg', 'jpeg', 'png'])
-            
-            if not os.path.exists(source_dir):
-                os.makedirs(source_dir, exist_ok=True)
-                self.logger.print_warning(f"⚠️ 入力ディレクトリを作成しました: {source_dir}")
-            
-            self.input_pool = InputImagePool(
-                source_dir, formats,
-                history_file=os.path.join(self.temp_dir, 'image_history.json')
-            )
-
         # ★ 修正: input_path を最初に初期化
         input_path = None
 
@@ -372,36 +477,65 @@ class HybridBijoImageGeneratorV7:
             input_path = None
             self.logger.print_warning(f"⚠️ 入力画像取得エラー: {e}")
 
-        # ===============================================
-        # ポーズモード確認とデバッグ出力
-        # ===============================================
-        # ★ 修正: ポーズモード取得の安全化
-        if hasattr(self.pose_manager, 'get_pose_mode'):
-            current_pose_mode = self.pose_manager.get_pose_mode()
-        else:
-            current_pose_mode = getattr(self.pose_manager, 'pose_mode', 'detection')
-
-        # None の場合のフォールバック
-        if current_pose_mode is None:
-            current_pose_mode = 'detection'
-
-        self.logger.print_status(f"🎯 現在のポーズモード: {current_pose_mode}")
-
         # ===============================================
         # 既存の前処理ロジック（pose_mode 伝達修正）
         # ===============================================
-        proc = ImageProcessor(self.config, self.temp_dir, current_pose_mode)
-        
-        if input_path and current_pose_mode == "detection":
+        proc = self.image_processor
+        proc.pose_mode = pose_mode
+
+        if input_path and pose_mode == "detection":
             resized = proc.preprocess_input_image(input_path)
             b64 = proc.encode_image_to_base64(resized)
             self.logger.print_success(f"✅ 入力画像処理完了 (ポーズ検出モード)")
         else:
-            resized = None
             b64 = None
-            if current_pose_mode == "specification":
+            if pose_mode == "specification":
                 self.logger.print_status("🎯 ポーズ指定モード: 入力画像処理をスキップ")
 
+        return input_path, b64
+
+    def _generate_single(self, gen_type: GenerationType, index: int, prefetch_next: bool = False):
+        """
+        単発生成ワークフロー（ポーズモード対応修正版 + メモリ管理強化）
+        - prefetch_next: 生成 API の待ち時間中に次の画像の入力準備を先行実行する
+        """
+        # ===============================================
+        # 既存の入力画像選択ロジック（修正版）
+        # ===============================================
+        if not self.input_pool:
+            cfg = self.config.get('input_images', {})
+            source_dir = cfg.get('source_directory', '/tmp/input')
+            formats = cfg.get('supported_formats', ['jpg', 'jpeg', 'png'])
+            
+            if not os.path.exists(source_dir):
+                os.makedirs(source_dir, exist_ok=True)
+                self.logger.print_warning(f"⚠️ 入力ディレクトリを作成しました: {source_dir}")
+            
+            self.input_pool = InputImagePool(
+                source_dir, formats,
+                history_file=os.path.join(self.temp_dir, 'image_history.json'),
+                ignore_dirs=cfg.get('ignore_dirs')
+            )
+
+        # ===============================================
+        # ポーズモード確認とデバッグ出力
+        # ===============================================
+        # PoseManager は pose_mode を必ず初期化し、get_pose_mode は設定ファイルの最新値を返す
+        current_pose_mode = self.pose_manager.get_pose_mode() or 'detection'
+
+        self.logger.print_status(f"🎯 現在のポーズモード: {current_pose_mode}")
+
+        # 先行準備済みの入力があれば使用（ポーズモードが変わっていれば準備し直す）
+        pending, self._pending_input = self._pending_input, None
+        if pending and pending[0] == current_pose_mode:
+            input_path, b64 = pending[1].result()
+            self.logger.print_status("⚡ 先行準備済みの入力画像を使用")
+        else:
+            if pending:
+                pending[1].result()  # 共有バッファの使用完了を待つ
+            input_path, b64 = self._prepare_input(current_pose_mode)
+        proc = self.image_processor
+
         # ===============================================
         # プロンプト構築（pose_manager 直接渡し・修正版）
         # ===============================================
@@ -419,13 +553,25 @@ class HybridBijoImageGeneratorV7:
         # ===============================================
         # 生成実行（pose_mode 伝達）
         # ===============================================
-        engine = GeneratorEngine(self.config, current_pose_mode, self.logger)
-        img_path, resp = engine.execute_generation(prompt, neg, ad_neg, input_b64=b64)
+        # 次の画像の入力準備をバックグラウンドで開始（API 待ち時間と重ねる）
+        if prefetch_next:
+            self._pending_input = (current_pose_mode,
+                                   self._input_prefetcher.submit(self._prepare_input, current_pose_mode))
+
+        # Bedrock コメント生成はプロンプトのみに依存するため、SDXL 生成と並行して開始
+        comments_future = self._submit_bedrock_comments(gen_type, index, prompt, current_pose_mode)
+
+        local_mode = self.config.get('local_execution', {}).get('enabled', True)
+        engine = self.generator_engine
+        engine.pose_mode = current_pose_mode
+        # AWS保存時は生成画像をディスクに書き出さず、メモリ上のまま仕上げ・アップロードする
+        img_path, resp = engine.execute_generation(prompt, neg, ad_neg, input_b64=b64,
+                                                   in_memory=not local_mode)
 
         # ===============================================
         # 既存の仕上げ処理ロジック（完全保持）
         # ===============================================
-        if img_path and os.path.exists(img_path):
+        if img_path and (not local_mode or os.path.exists(img_path)):
             proc.apply_final_enhancement(img_path)
 
         # ===============================================
@@ -433,22 +579,25 @@ class HybridBijoImageGeneratorV7:
         # ===============================================
         # 既存のレスポンスデータに11スロット情報を追加
         # メタデータ拡張とBedrockコメント生成を分離
-        enhanced_resp = self._enhance_metadata_with_bedrock_comments(resp, gen_type, index)
+        enhanced_resp = self._enhance_metadata_with_bedrock_comments(resp, gen_type, index,
+                                                                     comments_future=comments_future)
 
         # ===============================================
         # 既存の保存ロジック（11スロット対応強化）
         # ===============================================
-        saver = ImageSaver(self.config, self.aws, self.temp_dir,
-                          local_mode=self.config.get('local_execution', {}).get('enabled', True))
+        saver = self.image_saver
+        saver.dynamodb_writer = self._dynamodb_writer
         
-        if self.config.get('local_execution', {}).get('enabled', True):
+        if local_mode:
             # ローカル保存（既存機能 + 11スロット対応）
-            pose_mode = current_pose_mode  # ★ 修正: 正しいpose_modeを使用
-            saver.save_image_locally(img_path, index, enhanced_resp, gen_type, input_path, pose_mode)
+            saver.save_image_locally(img_path, index, enhanced_resp, gen_type, input_path, current_pose_mode)
         else:
             # AWS保存（既存機能 + 11スロット対応）
-            pose_mode = current_pose_mode  # ★ 修正: 正しいpose_modeを使用
-            saver.save_image_to_s3_and_dynamodb(img_path, index, enhanced_resp, gen_type, input_path, pose_mode)
+            # アップロードはネットワーク待ちのみのため、バックグラウンドで実行して次の画像の生成と重ねる
+            # （完了待ちと DynamoDB 送信は _dynamodb_batch_writer の終了時）
+            self._pending_saves.append(self._save_executor.submit(
+                saver.save_image_to_s3_and_dynamodb,
+                img_path, index, enhanced_resp, gen_type, input_path, current_pose_mode))
 
         # ★ 追加: 生成完了後の明示的なメモリ管理
         try:
@@ -461,8 +610,6 @@ class HybridBijoImageGeneratorV7:
                 del proc
             if 'b64' in locals() and b64:
                 del b64
-            if 'resized' in locals() and resized:
-                del resized
             
             # 5回に1回は強制メモリチェック
             if index % 5 == 0:
@@ -474,15 +621,43 @@ class HybridBijoImageGeneratorV7:
 
         return img_path, enhanced_resp
 
-    def _enhance_metadata_with_bedrock_comments(self, metadata: dict, gen_type, index: int) -> dict:
-        """メタデータにBedrockコメントを追加（分離されたメソッド・修正版）"""
+    def _bedrock_comment_metadata(self, gen_type, index: int, prompt: str, pose_mode: str) -> dict:
+        """Bedrockコメント生成用のメタデータ"""
+        return {
+            'genre': gen_type.name,
+            'style': 'general',
+            'imageId': f"temp_{int(time.time())}_{index}",
+            'prompt': (prompt or '')[:500],
+            'pose_mode': pose_mode
+        }
+
+    def _submit_bedrock_comments(self, gen_type, index: int, prompt: str, pose_mode: str):
+        """
+        Bedrockコメント生成をバックグラウンドで開始（生成 API の待ち時間と重ねる）
+        Returns: Future（コメント生成対象外の場合は None）
+        """
+        if (self.bedrock_manager is None
+                or self.config.get('local_execution', {}).get('enabled', True)
+                or not self.config.get('bedrock_features', {}).get('enabled', False)):
+            return None
+        bedrock_metadata = self._bedrock_comment_metadata(gen_type, index, prompt, pose_mode)
+        self.logger.print_status("🤖 Bedrockコメント生成をバックグラウンドで開始")
+        return self._comment_executor.submit(self.bedrock_manager.generate_all_timeslot_comments,
+                                             bedrock_metadata)
+
+    def _enhance_metadata_with_bedrock_comments(self, metadata: dict, gen_type, index: int,
+                                                comments_future=None) -> dict:
+        """
+        メタデータにBedrockコメントを追加（分離されたメソッド・修正版）
+        - comments_future: _submit_bedrock_comments で先行開始した生成結果（あれば完了を待って使用）
+        """
         # デバッグログ追加
-        self.logger.print_status(f"🔍 DEBUG: bedrock_manager存在確認 = {hasattr(self, 'bedrock_manager') and self.bedrock_manager is not None}")
+        self.logger.print_status(f"🔍 DEBUG: bedrock_manager存在確認 = {self.bedrock_manager is not None}")
         self.logger.print_status(f"🔍 DEBUG: local_execution.enabled = {self.config.get('local_execution', {}).get('enabled', True)}")
         self.logger.print_status(f"🔍 DEBUG: bedrock_features.enabled = {self.config.get('bedrock_features', {}).get('enabled', False)}")
 
-        # bedrock_manager属性の安全な確認
-        if not hasattr(self, 'bedrock_manager') or self.bedrock_manager is None:
+        # bedrock_manager は __init__ で必ず初期化済み
+        if self.bedrock_manager is None:
             self.logger.print_status("📋 BedrockManagerが初期化されていないため、コメント生成をスキップ")
             metadata['comments'] = {}
             metadata['commentGeneratedAt'] = ''
@@ -505,17 +680,14 @@ class HybridBijoImageGeneratorV7:
             return metadata
 
         try:
-            self.logger.print_status("🤖 Bedrockコメント生成開始...")
-            
-            bedrock_metadata = {
-                'genre': gen_type.name,
-                'style': 'general',
-                'imageId': f"temp_{int(time.time())}_{index}",
-                'prompt': metadata.get('prompt', '')[:500],
-                'pose_mode': getattr(self.pose_manager, 'pose_mode', 'detection')
-            }
-            
-            comments = self.bedrock_manager.generate_all_timeslot_comments(bedrock_metadata)
+            if comments_future is not None:
+                self.logger.print_status("🤖 Bedrockコメント生成結果を取得中...")
+                comments = comments_future.result()
+            else:
+                self.logger.print_status("🤖 Bedrockコメント生成開始...")
+                bedrock_metadata = self._bedrock_comment_metadata(gen_type, index, metadata.get('prompt', ''),
+                                                                  self.pose_manager.pose_mode)
+                comments = self.bedrock_manager.generate_all_timeslot_comments(bedrock_metadata)
             metadata['comments'] = comments
             metadata['commentGeneratedAt'] = datetime.now(JST).isoformat() if comments else ''
             
@@ -532,21 +704,8 @@ class HybridBijoImageGeneratorV7:
         return metadata
 
     def _get_fallback_comments(self) -> dict:
-        """ローカルモード用のフォールバックコメント"""
-        fallback_comments = {
-            'early_morning': "おはようございます！今日も素敵な一日になりそうです✨",
-            'morning': "今日もお仕事頑張ってください！応援しています📣",
-            'late_morning': "午前中お疲れ様！コーヒーブレイクでひと息つこう☕",
-            'lunch': "お昼休みですね！何か美味しいものを食べて午後も頑張りましょう🍽️",
-            'afternoon': "午後もお疲れ様！ティータイムで気分転換はいかが？🫖",
-            'pre_evening': "もうすぐ夕方ですね！今日一日もあと少し頑張って🌅",
-            'evening': "今日もお疲れ様でした！これからの予定はあるのかな？🌙",
-            'night': "今日もお疲れ様！夜の自分時間を大切に過ごしてね💆‍♀️",
-            'late_night': "深夜だけど今夜はどんな時間を過ごしてる？🌃",
-            'mid_night': "今日も一日お疲れ様でした！ゆっくり休んでおやすみなさい🌙✨",
-            'general': "素敵な時間をお過ごしください💫"
-        }
-        
+        """ローカルモード用のフォールバックコメント（定数テンプレートの複製を返す）"""
+        fallback_comments = FALLBACK_COMMENTS.copy()
         self.logger.print_status(f"📝 ローカルモード: フォールバックコメント使用（{len(fallback_comments)}件）")
         return fallback_comments
 
@@ -647,24 +806,38 @@ class HybridBijoImageGeneratorV7:
     # ===============================================
     # 既存メソッド保持用の追加メソッド（メモリ管理強化）
     # ===============================================
-    def generate_daily_batch(self):
-        """日次バッチ生成（メモリ管理強化版）"""
+    def generate_daily_batch(self, genres=None):
+        """
+        日次バッチ生成（メモリ管理強化版）
+        - genres: 対象ジャンル名のリスト（None で全ジャンル）。複数ワーカーでジャンルを分担する場合に指定
+        """
         self.logger.print_stage("🗓️ 日次バッチ生成開始（メモリ管理強化版）")
         
         batch_size = self.config.get('generation', {}).get('batch_size', 5)
         total_success = 0
+
+        if genres is None:
+            generation_types = self.generation_types
+        else:
+            generation_types = [self.generation_types_by_name[g] for g in genres
+                                if g in self.generation_types_by_name]
+            unknown = [g for g in genres if g not in self.generation_types_by_name]
+            if unknown:
+                self.logger.print_warning(f"⚠️ 未定義ジャンルをスキップ: {', '.join(unknown)}")
         
         # バッチ開始前の初期メモリクリーンアップ
-        self.memory_manager.perform_aggressive_memory_cleanup()
+        self.memory_manager.perform_light_memory_cleanup()
         
-        for gen_type in self.generation_types:
+        # DynamoDB 登録はジャンルごとに generate_hybrid_image 内で送信する（長時間未登録のまま残さない）
+        last_index = len(generation_types) - 1
+        for type_index, gen_type in enumerate(generation_types):
             try:
-                success = self.generate_hybrid_image(gen_type, batch_size)
+                # 次ジャンル最初の入力準備（ジャンルに依存しない）を現ジャンル最後の生成と重ねる
+                success = self.generate_hybrid_image(gen_type, batch_size,
+                                                     prefetch_after=type_index < last_index)
                 total_success += success
                 self.logger.print_status(f"📊 {gen_type.name}: {success}/{batch_size}枚成功")
-                
-                # 各ジャンル完了後のメモリクリーンアップ
-                self.memory_manager.perform_aggressive_memory_cleanup()
+                # ジャンル完了時のクリーンアップは generate_hybrid_image 内の画像ごとの処理で実行済み
                 
             except Exception as e:
                 self.logger.print_error(f"❌ {gen_type.name}生成エラー: {e}")
@@ -674,9 +847,7 @@ class HybridBijoImageGeneratorV7:
                 except:
                     pass
                 continue
-        
-        # 全バッチ完了後の最終クリーンアップ
-        self.memory_manager.perform_aggressive_memory_cleanup()
+        self._discard_pending_input()
         
         self.logger.print_stage(f"🎉 日次バッチ完了: 総計{total_success}枚生成")
         return total_success
@@ -684,9 +855,17 @@ class HybridBijoImageGeneratorV7:
     def cleanup_temp_files(self):
         """一時ファイル清理（既存機能保持）"""
         try:
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-                os.makedirs(self.temp_dir, exist_ok=True)
+            # ディレクトリ自体は残し、scandir の DirEntry（d_type）で追加の stat なしに中身を削除
+            os.makedirs(self.temp_dir, exist_ok=True)
+            with os.scandir(self.temp_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(entry.path)
+                        else:
+                            os.unlink(entry.path)
+                    except OSError:
+                        pass
             self.logger.print_success("✅ 一時ファイル清理完了")
         except Exception as e:
             self.logger.print_warning(f"⚠️ 一時ファイル清理エラー: {e}")
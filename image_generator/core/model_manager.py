@@ -7,6 +7,7 @@ ModelManager - モデル管理機能
 
 import requests
 import time
+from requests.adapters import HTTPAdapter
 from common.logger import ColorLogger
 from common.types import HybridGenerationError
 
@@ -21,13 +22,24 @@ class ModelManager:
         self.api_url = sd_config.get('api_url', 'http://localhost:7860')
         self.timeout = sd_config.get('timeout', 3600)
         self.verify_ssl = sd_config.get('verify_ssl', False)
+        self._options_url = f"{self.api_url}/sdapi/v1/options"
+        self._models_url = f"{self.api_url}/sdapi/v1/sd-models"
         
         # モデル切り替え設定
         switch_config = config.get('model_switching', {})
         self.switch_enabled = switch_config.get('enabled', True)
         self.switch_timeout = switch_config.get('switch_timeout', 180)
-        self.wait_after_switch = switch_config.get('wait_after_switch', 10)
-        self.verification_retries = switch_config.get('verification_retries', 3)
+        self.poll_interval = switch_config.get('poll_interval', 1)
+        
+        # API呼び出しは同一セッションで接続を再利用（keep-alive・コネクションプール）
+        self._sd_session = requests.Session()
+        self._sd_session.verify = self.verify_ssl
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._sd_session.mount('http://', adapter)
+        self._sd_session.mount('https://', adapter)
+        
+        # 最後に確認できたモデル名（切り替え成功・一致確認時に更新）
+        self._current_model_cache = None
     
     def ensure_model_for_generation_type(self, gen_type):
         """生成タイプに応じたモデル確保"""
@@ -39,9 +51,17 @@ class ModelManager:
                 self.logger.print_warning("⚠️ モデル切り替えが無効化されています")
                 return
             
-            # 現在のモデル確認
-            current_model = self.get_current_model()
+            # 直前に確認済みのモデルと同じならAPI呼び出しなしで終了
+            if self._current_model_cache == model_name:
+                self.logger.print_success(f"✅ モデル確認済み（API確認省略）: {model_name}")
+                return
+            
+            # 現在のモデル確認（確認済みのモデルがあればAPI呼び出しを省略）
+            current_model = self._current_model_cache
+            if current_model is None:
+                current_model = self.get_current_model()
             if current_model == model_name:
+                self._current_model_cache = model_name
                 self.logger.print_success(f"✅ モデル既に選択済み: {model_name}")
                 return
             
@@ -50,25 +70,23 @@ class ModelManager:
             # モデル切り替え実行
             self.switch_model(model_name)
             
-            # 切り替え完了まで待機
-            time.sleep(self.wait_after_switch)
-            
-            # 切り替え確認
+            # 切り替え確認（反映され次第すぐに戻る）
             self.verify_model_switch(model_name)
+            self._current_model_cache = model_name
             
             self.logger.print_success(f"✅ モデル準備完了: {model_name}")
             
         except Exception as e:
+            self._current_model_cache = None
             self.logger.print_error(f"❌ モデル切り替えエラー: {e}")
             raise HybridGenerationError(f"モデル準備エラー: {e}")
     
     def get_current_model(self):
         """現在のモデル取得"""
         try:
-            response = requests.get(
-                f"{self.api_url}/sdapi/v1/options",
-                timeout=30,
-                verify=self.verify_ssl
+            response = self._sd_session.get(
+                self._options_url,
+                timeout=30
             )
             response.raise_for_status()
             data = response.json()
@@ -76,6 +94,7 @@ class ModelManager:
             self.logger.print_status(f"🔍 現在のモデル: {current_model}")
             return current_model
         except Exception as e:
+            self._current_model_cache = None
             self.logger.print_warning(f"⚠️ 現在のモデル取得失敗: {e}")
             return ""
     
@@ -86,11 +105,10 @@ class ModelManager:
                 "sd_model_checkpoint": model_name
             }
             
-            response = requests.post(
-                f"{self.api_url}/sdapi/v1/options",
+            response = self._sd_session.post(
+                self._options_url,
                 json=payload,
-                timeout=self.switch_timeout,
-                verify=self.verify_ssl
+                timeout=self.switch_timeout
             )
             response.raise_for_status()
             self.logger.print_status(f"🔄 モデル切り替え要求送信完了")
@@ -100,36 +118,34 @@ class ModelManager:
         except requests.exceptions.RequestException as e:
             raise HybridGenerationError(f"モデル切り替えAPI呼び出し失敗: {e}")
     
+    def invalidate_model_cache(self):
+        """確認済みモデルの記録を破棄（API エラー後などに次回の実機確認を強制）"""
+        self._current_model_cache = None
+    
     def verify_model_switch(self, expected_model):
-        """モデル切り替え確認"""
-        for attempt in range(self.verification_retries):
-            try:
-                current_model = self.get_current_model()
-                if current_model == expected_model:
-                    self.logger.print_success(f"✅ モデル切り替え確認完了: {expected_model}")
-                    return True
-                
-                if attempt < self.verification_retries - 1:
-                    self.logger.print_status(f"🔄 切り替え確認待機中... ({attempt + 1}/{self.verification_retries})")
-                    time.sleep(5)
-                
-            except Exception as e:
-                if attempt < self.verification_retries - 1:
-                    self.logger.print_warning(f"⚠️ 切り替え確認失敗 ({attempt + 1}/{self.verification_retries}): {e}")
-                    time.sleep(5)
-                else:
-                    raise HybridGenerationError(f"モデル切り替え確認失敗: {e}")
+        """モデル切り替え確認（一致するまで短い間隔でポーリング、switch_timeout で打ち切り）"""
+        start_time = time.time()
+        deadline = start_time + self.switch_timeout
+        while True:
+            current_model = self.get_current_model()
+            if current_model == expected_model:
+                elapsed = time.time() - start_time
+                self.logger.print_success(f"✅ モデル切り替え確認完了: {expected_model} ({elapsed:.1f}秒)")
+                return True
+            
+            if time.time() >= deadline:
+                break
+            self.logger.print_status("🔄 切り替え確認待機中...")
+            time.sleep(self.poll_interval)
         
-        # 全てのリトライが失敗した場合
         raise HybridGenerationError(f"モデル切り替え確認失敗: 期待値={expected_model}, 実際={current_model}")
     
     def list_available_models(self):
         """利用可能なモデル一覧取得"""
         try:
-            response = requests.get(
-                f"{self.api_url}/sdapi/v1/sd-models",
-                timeout=30,
-                verify=self.verify_ssl
+            response = self._sd_session.get(
+                self._models_url,
+                timeout=30
             )
             response.raise_for_status()
             models = response.json()
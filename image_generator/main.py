@@ -7,6 +7,27 @@ Image Generator Main Entry Point
 
 import sys
 import os
+import argparse
+
+# メインメニュー（毎回 print を10回呼ばず、1回の書き込みで表示）
+_SEPARATOR = "=" * 60
+MAIN_MENU_TEXT = "\n".join((
+    "",
+    _SEPARATOR,
+    "📋 メイン機能選択",
+    _SEPARATOR,
+    "1. 画像生成（単発）",
+    "2. 画像生成（バッチ）",
+    "3. 日次バッチ生成",
+    "4. ポーズモード設定",
+    "5. 設定確認",
+    "6. 終了",
+    _SEPARATOR,
+))
+
+def _print_genre_menu(genres):
+    """ジャンル選択肢を1回の書き込みで表示"""
+    print("\n📂 ジャンル選択:\n" + "\n".join(f"{i}. {genre}" for i, genre in enumerate(genres, 1)))
 
 def show_interactive_menu():
     """インタラクティブCUIメニュー表示"""
@@ -15,43 +36,36 @@ def show_interactive_menu():
     logger.print_stage("🎨 美少女画像生成ツール Ver7.0")
 
     while True:
-        print("\n" + "="*60)
-        print("📋 メイン機能選択")
-        print("="*60)
-        print("1. 画像生成（単発）")
-        print("2. 画像生成（バッチ）")
-        print("3. 日次バッチ生成")
-        print("4. ポーズモード設定")
-        print("5. 設定確認")
-        print("6. 終了")
-        print("="*60)
+        print(MAIN_MENU_TEXT)
 
         try:
-            choice = input("選択 (1-6): ").strip()
-            if choice == "1":
-                single_generation()
-            elif choice == "2":
-                batch_generation()
-            elif choice == "3":
-                daily_batch_generation()
-            elif choice == "4":
-                pose_mode_setting()
-            elif choice == "5":
-                show_config()
-            elif choice == "6":
+            if not run_choice(input("選択 (1-6): ").strip()):
                 logger.print_success("🔚 終了します")
                 break
-            else:
-                print("❌ 無効な選択です")
         except KeyboardInterrupt:
             logger.print_warning("\n🛑 処理を中断しました")
             break
 
+def run_choice(choice: str) -> bool:
+    """
+    メインメニューの選択肢を実行（メニュー表示・入力待ちなしで呼び出し可能）
+    Returns: 終了選択時は False、それ以外は True
+    """
+    if choice == EXIT_CHOICE:
+        return False
+    handler = MENU_HANDLERS.get(choice)
+    if handler is None:
+        print("❌ 無効な選択です")
+    else:
+        handler()
+    return True
+
 def single_generation():
     """単発画像生成"""
     from common.logger import ColorLogger
     logger = ColorLogger()
 
+    generator = None
     try:
         from .core.generator import HybridBijoImageGeneratorV7
         from .batch.processor import BatchProcessor
@@ -59,10 +73,8 @@ def single_generation():
         generator = HybridBijoImageGeneratorV7()
         processor = BatchProcessor(generator, generator.config)
 
-        genres = [gt.name for gt in generator.generation_types]
-        print("\n📂 ジャンル選択:")
-        for i, genre in enumerate(genres, 1):
-            print(f"{i}. {genre}")
+        genres = generator.genre_names
+        _print_genre_menu(genres)
 
         choice = input("ジャンル番号: ").strip()
         if not choice.isdigit() or int(choice) < 1 or int(choice) > len(genres):
@@ -70,7 +82,7 @@ def single_generation():
             return
 
         genre = genres[int(choice)-1]
-        gen_type = next(gt for gt in generator.generation_types if gt.name == genre)
+        gen_type = generator.generation_types_by_name[genre]
 
         logger.print_stage(f"🎨 {genre} 画像生成開始")
         result = processor.generate_hybrid_image(gen_type, 1)
@@ -79,11 +91,16 @@ def single_generation():
     except Exception as e:
         logger.print_error(f"❌ 生成エラー: {e}")
         import traceback; traceback.print_exc()
+    finally:
+        if generator is not None:
+            generator.close()
+
 def batch_generation():
     """バッチ画像生成"""
     from common.logger import ColorLogger
     logger = ColorLogger()
 
+    generator = None
     try:
         from .core.generator import HybridBijoImageGeneratorV7
         from .batch.processor import BatchProcessor
@@ -91,10 +108,8 @@ def batch_generation():
         generator = HybridBijoImageGeneratorV7()
         processor = BatchProcessor(generator, generator.config)
 
-        genres = [gt.name for gt in generator.generation_types]
-        print("\n📂 ジャンル選択:")
-        for i, genre in enumerate(genres, 1):
-            print(f"{i}. {genre}")
+        genres = generator.genre_names
+        _print_genre_menu(genres)
 
         choice = input("ジャンル番号: ").strip()
         if not choice.isdigit() or int(choice) < 1 or int(choice) > len(genres):
@@ -111,12 +126,16 @@ def batch_generation():
     except Exception as e:
         logger.print_error(f"❌ 生成エラー: {e}")
         import traceback; traceback.print_exc()
+    finally:
+        if generator is not None:
+            generator.close()
 
 def daily_batch_generation():
     """日次バッチ生成"""
     from common.logger import ColorLogger
     logger = ColorLogger()
 
+    generator = None
     try:
         from .core.generator import HybridBijoImageGeneratorV7
         from .batch.processor import BatchProcessor
@@ -130,6 +149,9 @@ def daily_batch_generation():
     except Exception as e:
         logger.print_error(f"❌ 生成エラー: {e}")
         import traceback; traceback.print_exc()
+    finally:
+        if generator is not None:
+            generator.close()
 
 def pose_mode_setting():
     """ポーズモード設定（永続化対応版）"""
@@ -183,13 +205,16 @@ def pose_mode_setting():
         test_choice = input("\nテスト画像を1枚生成しますか？ (y/N): ").strip().lower()
         if test_choice == 'y':
             generator = HybridBijoImageGeneratorV7()
-            if generator.generation_types:
-                print("🎨 テスト画像生成中...")
-                success = generator.generate_hybrid_image(generator.generation_types[0], 1)
-                if success:
-                    print("✅ テスト画像生成完了！")
-                else:
-                    print("❌ テスト画像生成失敗")
+            try:
+                if generator.generation_types:
+                    print("🎨 テスト画像生成中...")
+                    success = generator.generate_hybrid_image(generator.generation_types[0], 1)
+                    if success:
+                        print("✅ テスト画像生成完了！")
+                    else:
+                        print("❌ テスト画像生成失敗")
+            finally:
+                generator.close()
             
     except Exception as e:
         print(f"❌ ポーズモード設定エラー: {e}")
@@ -202,6 +227,7 @@ def show_config():
     from common.logger import ColorLogger
     logger = ColorLogger()
 
+    generator = None
     try:
         from .core.generator import HybridBijoImageGeneratorV7
         generator = HybridBijoImageGeneratorV7()
@@ -216,35 +242,108 @@ def show_config():
     except Exception as e:
         logger.print_error(f"❌ 設定読み込みエラー: {e}")
         import traceback; traceback.print_exc()
-def main():
-    """メインエントリーポイント"""
+    finally:
+        if generator is not None:
+            generator.close()
+
+# メインメニューの選択肢 → 処理関数（"6" は終了）
+EXIT_CHOICE = "6"
+MENU_HANDLERS = {
+    "1": single_generation,
+    "2": batch_generation,
+    "3": daily_batch_generation,
+    "4": pose_mode_setting,
+    "5": show_config,
+}
+
+def build_arg_parser():
+    """コマンドライン引数パーサー（スケジュール実行・スクリプト実行用）"""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m image_generator.main",
+        description="美少女画像生成ツール（引数なしでインタラクティブモード）",
+        epilog="旧形式: batch <genre> [count] / batch daily も引き続き使用できます"
+    )
+    parser.add_argument('legacy', nargs='*', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=['single', 'batch', 'daily'],
+                        help="実行モード（single: 単発, batch: ジャンル指定バッチ, daily: 日次バッチ）")
+    parser.add_argument('--genre', help="生成ジャンル（single / batch で必須）")
+    parser.add_argument('--count', type=int, default=1, help="生成枚数（batch のみ、既定: 1）")
+    parser.add_argument('--genres',
+                        help="daily で対象とするジャンル（カンマ区切り、既定: 全ジャンル）。ワーカーごとのジャンル分担用")
+    parser.add_argument('--pose-mode', choices=['detection', 'specification'],
+                        help="ポーズモードを設定して実行（設定は config/pose_mode.json に保存）")
+    parser.add_argument('--config', default='config/config_v10.yaml',
+                        help="設定ファイル（既定: config/config_v10.yaml）。複数ワーカー実行時はワーカーごとに "
+                             "WebUI の接続先と temp_files.directory を変えた設定を指定")
+    return parser
+
+def run_cli(args) -> int:
+    """
+    メニューを介さずに生成を実行
+    Returns: 成功枚数（未定義ジャンルは 0）
+    """
+    from .core.generator import HybridBijoImageGeneratorV7
+    from .batch.processor import BatchProcessor
+
+    generator = HybridBijoImageGeneratorV7(args.config)
     try:
-        if len(sys.argv) >= 2 and sys.argv[1] == "batch":
-            from .core.generator import HybridBijoImageGeneratorV7
-            from .batch.processor import BatchProcessor
+        processor = BatchProcessor(generator, generator.config)
 
-            generator = HybridBijoImageGeneratorV7()
-            processor = BatchProcessor(generator, generator.config)
+        if args.pose_mode:
+            generator.pose_manager.set_pose_mode(args.pose_mode)
+
+        if args.mode == "daily":
+            genres = [g.strip() for g in args.genres.split(',') if g.strip()] if args.genres else None
+            return processor.generate_daily_hybrid_batch(genres=genres)
+        elif args.mode == "single":
+            gen_type = generator.generation_types_by_name.get(args.genre)
+            if gen_type is None:
+                from common.logger import ColorLogger
+                ColorLogger().print_error(f"未定義ジャンル: {args.genre}")
+                return 0
+            return processor.generate_hybrid_image(gen_type, 1)
+        else:
+            return processor.generate_hybrid_batch(args.genre, args.count)
+    finally:
+        generator.close()
+
+def main(argv=None):
+    """
+    メインエントリーポイント
+    - 例外時、および引数指定（ヘッドレス）実行で未定義ジャンル・成功0枚のときは終了コード 1 で終了する
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    # 旧形式: batch <genre> [count] / batch daily
+    if args.legacy:
+        if args.legacy[0] != "batch" or not 2 <= len(args.legacy) <= 3 or args.mode:
+            parser.print_help()
+            return
+        args.genre = args.legacy[1]
+        args.mode = "daily" if args.genre == "daily" else "batch"
+        if len(args.legacy) == 3:
+            if not args.legacy[2].isdigit():
+                parser.error(f"生成枚数が不正です: {args.legacy[2]}")
+            args.count = int(args.legacy[2])
 
-            genre = sys.argv[2]
-            count = int(sys.argv[3]) if len(sys.argv) >= 4 else 1
+    if args.mode in ("single", "batch") and not args.genre:
+        parser.error(f"--mode {args.mode} には --genre が必要です")
 
-            if genre == "daily":
-                processor.generate_daily_hybrid_batch()
-            else:
-                processor.generate_hybrid_batch(genre, count)
-        elif len(sys.argv) == 1:
-            show_interactive_menu()
+    try:
+        if args.mode:
+            if not run_cli(args):
+                from common.logger import ColorLogger
+                ColorLogger().print_error("❌ 生成成功 0枚")
+                sys.exit(1)
         else:
-            print("使用方法:")
-            print("  python3 -m image_generator.main             # インタラクティブモード")
-            print("  python3 -m image_generator.main batch <genre> [count]  # バッチモード")
-            print("  python3 -m image_generator.main batch daily          # 日次バッチ")
+            show_interactive_menu()
     except Exception as e:
         from common.logger import ColorLogger
         logger = ColorLogger()
         logger.print_error(f"❌ メインエラー: {e}")
         import traceback; traceback.print_exc()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,7 @@
 """
 MemoryManager - ウルトラメモリ管理システム
 - check_memory_usage: VRAM 使用量監視
+- perform_light_memory_cleanup: 軽量メモリクリーンアップ
 - perform_aggressive_memory_cleanup: 積極的メモリクリーンアップ
 - escalate_memory_adjustment: 段階的メモリ調整
 - execute_with_ultra_memory_safety: メモリセーフ実行
@@ -11,13 +12,28 @@ MemoryManager - ウルトラメモリ管理システム
 
 import time
 import gc
-import torch
+import ctypes
+import ctypes.util
 from common.logger import ColorLogger
-from common.types import HybridGenerationError
+from common.types import HybridGenerationError, CUDAOutOfMemoryError
+
+def _load_glibc():
+    """glibc を読み込む（glibc 以外の環境では None）"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        libc.malloc_trim  # glibc 固有関数の存在確認
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+_LIBC = _load_glibc()
 
 class MemoryManager:
     """ウルトラメモリ管理システムクラス"""
 
+    # バイト → GB 換算
+    _GIB = 1 << 30
+
     def __init__(self, config: dict):
         self.logger = ColorLogger()
         mem_cfg = config.get('memory_management', {})
@@ -44,16 +60,23 @@ class MemoryManager:
 
     def check_memory_usage(self, force_cleanup=False) -> bool:
         """VRAM 使用量の監視と閾値超過時対応"""
-        if not torch.cuda.is_available() or not self.enabled:
+        if not self.enabled:
+            return True
+        # torch は読み込みが重いため、実際に VRAM を扱う時点で遅延インポート
+        import torch
+        if not torch.cuda.is_available():
             return True
         try:
-            alloc = torch.cuda.memory_allocated() / 1024**3
-            total = torch.cuda.get_device_properties(0).total_memory / 1024**3
-            percent = (alloc/total)*100
-            self.logger.print_status(f"🧠 VRAM使用: {alloc:.2f}GB/{total:.2f}GB ({percent:.1f}%)")
+            # ドライバから空き/総量を1回で取得（他プロセス・他ライブラリの使用分も反映）
+            free_bytes, total_bytes = torch.cuda.mem_get_info()
+            used = (total_bytes - free_bytes) / self._GIB
+            total = total_bytes / self._GIB
+            percent = (used/total)*100
+            reserved = torch.cuda.memory_reserved() / self._GIB
+            self.logger.print_status(f"🧠 VRAM使用: {used:.2f}GB/{total:.2f}GB ({percent:.1f}%) [PyTorch予約: {reserved:.2f}GB]")
             if force_cleanup or percent > self.threshold:
                 if force_cleanup:
-                    self.perform_aggressive_memory_cleanup()
+                    self.perform_light_memory_cleanup()
                 else:
                     self.logger.print_warning(f"⚠️ VRAM {self.threshold}% 超過: {percent:.1f}%")
                     self.perform_aggressive_memory_cleanup()
@@ -65,23 +88,57 @@ class MemoryManager:
             self.logger.print_error(f"❌ メモリ監視エラー: {e}")
             return True
 
+    def perform_light_memory_cleanup(self):
+        """軽量メモリクリーンアップ（通常の生成後用・待機なし）"""
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+                torch.cuda.ipc_collect()
+            gc.collect()
+            # 解放済みのヒープ領域を OS に返却（glibc のみ）
+            if _LIBC is not None:
+                _LIBC.malloc_trim(0)
+        except Exception as e:
+            self.logger.print_error(f"❌ メモリクリーンアップエラー: {e}")
+
     def perform_aggressive_memory_cleanup(self):
-        """積極的なメモリクリーンアップ"""
+        """積極的なメモリクリーンアップ（メモリ不足・閾値超過からの回復用）"""
         try:
             self.logger.print_status("🧹 積極的メモリクリーンアップ開始")
-            if torch.cuda.is_available():
-                for _ in range(3):
-                    torch.cuda.empty_cache()
-                    torch.cuda.synchronize()
-                    time.sleep(1)
-            for _ in range(3):
-                gc.collect()
-                time.sleep(0.5)
-            time.sleep(self.recovery_delay)
+            import torch
+            cuda_available = torch.cuda.is_available()
+            if cuda_available:
+                torch.cuda.empty_cache()
+                torch.cuda.synchronize()
+            gc.collect()
+            if cuda_available:
+                self._wait_for_vram_recovery(torch)
+            else:
+                # VRAM を観測できない環境では従来どおり固定時間待機
+                time.sleep(self.recovery_delay)
             self.logger.print_success("✅ メモリクリーンアップ完了")
         except Exception as e:
             self.logger.print_error(f"❌ メモリクリーンアップエラー: {e}")
 
+    def _wait_for_vram_recovery(self, torch, poll_interval: float = 1.0):
+        """
+        VRAM 使用率が閾値を下回るまで待機（最大 recovery_delay 秒）
+        - 固定時間の待機ではなく、解放を確認でき次第すぐに戻る
+        """
+        deadline = time.monotonic() + self.recovery_delay
+        while True:
+            free_bytes, total_bytes = torch.cuda.mem_get_info()
+            percent = (total_bytes - free_bytes) / total_bytes * 100
+            if percent <= self.threshold:
+                self.logger.print_status(f"🧠 VRAM回復: {percent:.1f}%")
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.print_warning(f"⚠️ VRAM回復待ちタイムアウト: {percent:.1f}%")
+                return False
+            time.sleep(min(poll_interval, remaining))
+
     def escalate_memory_adjustment(self) -> bool:
         """段階的メモリ調整（フォールバック解像度切り替え）"""
         self.current_level += 1
@@ -89,6 +146,7 @@ class MemoryManager:
             self.logger.print_error("❌ フォールバック解像度上限に到達")
             return False
         fb = self.fallback_resolutions[self.current_level]
+        import torch
         torch.cuda.empty_cache()
         torch.cuda.synchronize()
         # 設定反映は外部で対応
@@ -110,15 +168,16 @@ class MemoryManager:
                     self.logger.print_status(f"🛡️ 事前メモリチェック: {name}")
                     self.check_memory_usage(force_cleanup=True)
                 result = func()
-                self.perform_aggressive_memory_cleanup()
+                self.perform_light_memory_cleanup()
                 return result
-            except RuntimeError as e:
-                if "CUDA out of memory" in str(e) and attempt < max_retries-1:
+            except CUDAOutOfMemoryError as e:
+                if attempt < max_retries-1:
                     self.logger.print_warning(f"⚠️ {name} 再試行 ({attempt+1}/{max_retries})")
                     self.perform_aggressive_memory_cleanup()
                     if self.auto_adjust:
                         self.escalate_memory_adjustment()
-                    time.sleep(self.recovery_delay)
                     continue
                 raise HybridGenerationError(f"{name} メモリ不足: {e}")
+            except RuntimeError as e:
+                raise HybridGenerationError(f"{name} 実行エラー: {e}")
         raise HybridGenerationError(f"{name} 最大リトライ回数到達")
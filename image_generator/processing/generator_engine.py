@@ -12,9 +12,24 @@ import base64
 import os
 import requests
 import json
+import gzip
+from requests.adapters import HTTPAdapter
+from io import BytesIO
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
 from common.logger import ColorLogger
 from common.timer import ProcessTimer
-from common.types import HybridGenerationError
+from common.types import HybridGenerationError, CUDAOutOfMemoryError
 
 class GeneratorEngine:
     """SDXL統合生成実行クラス（ポーズ検出モード対応版・設定ファイル完全対応）"""
@@ -28,19 +43,109 @@ class GeneratorEngine:
         self.api_url = sd_cfg['api_url']
         self.timeout = sd_cfg['timeout']
         self.verify_ssl = sd_cfg['verify_ssl']
+        self._txt2img_url = f"{self.api_url}/sdapi/v1/txt2img"
+        # リクエストボディの gzip 圧縮（受信側が Content-Encoding: gzip を展開できる場合のみ有効化）
+        self.gzip_request = sd_cfg.get('gzip_request', False)
+
+        # API呼び出しは同一セッションで接続を再利用（keep-alive・TLSハンドシェイク省略）
+        self._sd_session = requests.Session()
+        self._sd_session.verify = self.verify_ssl
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        self._sd_session.mount('http://', adapter)
+        self._sd_session.mount('https://', adapter)
         
         # ControlNet, ADetailer 設定
         self.controlnet = config.get('controlnet', {})
         self.adetailer = config.get('adetailer', {})
+
+        # 生成ごとに参照する設定セクション（辞書自体を保持し、呼び出し時のキー連鎖を省く）
+        self.sdxl_cfg = config['sdxl_generation']
+        self.temp_dir = config['temp_files']['directory']
+
+        # 生成ごとに不変な ControlNet / ADetailer 引数は初期化時に1回だけ組み立てる
+        self._build_script_templates()
         
         # ★ 追加: 初期化時のデバッグ出力
         self.logger.print_status(f"🎯 GeneratorEngine初期化 - ポーズモード: {self.pose_mode}")
 
+    def _build_script_templates(self):
+        """ControlNet・ADetailer の引数テンプレート（入力画像・プロンプト以外）を構築"""
+        openpose = self.controlnet.get('openpose', {})
+        self._openpose_template = None
+        if openpose.get('enabled', False):
+            self._openpose_template = {
+                'enabled': True,  # ★ 修正: 明示的にTrueに設定
+                'module': openpose.get('module', 'dw_openpose_full'),
+                'model': openpose.get('model', 'control_v11p_sd15_openpose_fp16 [73c2b67d]'),
+                'weight': openpose.get('weight', 0.8),
+                'resize_mode': openpose.get('resize_mode', 'Just Resize'),
+                'low_vram': False,
+                'processor_res': openpose.get('processor_res', 512),
+                'threshold_a': openpose.get('threshold_a', 0.5),
+                'threshold_b': openpose.get('threshold_b', 0.5),
+                'guidance_start': openpose.get('guidance_start', 0.0),
+                'guidance_end': openpose.get('guidance_end', 0.7),
+                'control_mode': openpose.get('control_mode', 'ControlNet is more important'),
+                'pixel_perfect': openpose.get('pixel_perfect', True)
+            }
+
+        depth = self.controlnet.get('depth', {})
+        self._depth_template = None
+        if depth.get('enabled', False):
+            self._depth_template = {
+                'enabled': True,  # ★ 修正: 明示的にTrueに設定
+                'module': depth.get('module', 'depth_midas'),
+                'model': depth.get('model', 'control_v11f1p_sd15_depth_fp16 [4b72d323]'),
+                'weight': depth.get('weight', 0.6),
+                'resize_mode': depth.get('resize_mode', 'Crop and Resize'),
+                'low_vram': False,
+                'processor_res': depth.get('processor_res', 512),
+                'threshold_a': depth.get('threshold_a', 0.5),
+                'threshold_b': depth.get('threshold_b', 0.5),
+                'guidance_start': depth.get('guidance_start', 0.0),
+                'guidance_end': depth.get('guidance_end', 1.0),
+                'control_mode': depth.get('control_mode', 'Balanced'),
+                'pixel_perfect': depth.get('pixel_perfect', True)
+            }
+
+        # ADetailer: (表示名, プロンプト以外の引数) のリスト
+        self._adetailer_templates = []
+        self._adetailer_legacy = False
+        self._adetailer_multi = bool(self.adetailer.get('models'))
+        if self._adetailer_multi:
+            # 複数モデル設定を使用（設定ファイル完全対応）
+            model_configs = [(mc.get('name', 'Unknown'), mc) for mc in self.adetailer['models']]
+        elif self.adetailer.get('model', 'None') != 'None':
+            # 後方互換性: 既存の単一モデル設定を使用
+            model_configs = [(None, self.adetailer)]
+            self._adetailer_legacy = True
+        else:
+            model_configs = []
+        for name, model_config in model_configs:
+            if model_config.get('model', 'None') == 'None':
+                continue
+            self._adetailer_templates.append((name, {
+                "ad_model": model_config.get('model', 'face_yolov8n.pt'),
+                "ad_confidence": model_config.get('confidence', 0.3),
+                "ad_mask_blur": model_config.get('mask_blur', 4),
+                "ad_denoising_strength": model_config.get('denoising_strength', 0.4),
+                "ad_inpaint_only_masked": model_config.get('inpaint_only_masked', True),
+                "ad_inpaint_only_masked_padding": model_config.get('inpaint_only_masked_padding', 32),
+                "ad_inpaint_width": model_config.get('inpaint_width', 512),
+                "ad_inpaint_height": model_config.get('inpaint_height', 640),
+                "ad_use_steps": model_config.get('use_steps', False),
+                "ad_steps": model_config.get('steps', 12),
+                "ad_use_cfg_scale": model_config.get('use_cfg_scale', False),
+                "ad_cfg_scale": model_config.get('cfg_scale', 6.5),
+                "is_api": []
+            }))
+
     def execute_generation(self, prompt: str, negative_prompt: str,
-                          adetailer_negative: str, input_b64: str=None):
+                          adetailer_negative: str, input_b64: str=None, in_memory: bool=False):
         """
         SDXL統合プロンプト生成（ポーズモード完全対応版）
-        Returns: (保存パス, API レスポンス)
+        - in_memory=True の場合はディスクに書き出さず BytesIO を返す（S3 直接アップロード用）
+        Returns: (保存パス または BytesIO, API レスポンス)
         """
         def _generate():
             timer = ProcessTimer(self.logger)
@@ -64,14 +169,15 @@ class GeneratorEngine:
             self.logger.print_status(f"  - 最終判定: {controlnet_should_be_enabled}")
 
             # 1. 基本Payload設定
+            sdxl_cfg = self.sdxl_cfg
             payload = {
                 "prompt": prompt,
                 "negative_prompt": negative_prompt,
-                "steps": self.config['sdxl_generation']['steps'],
-                "sampler_name": self.config['sdxl_generation']['sampler_name'],
-                "cfg_scale": self.config['sdxl_generation']['cfg_scale'],
-                "width": self.config['sdxl_generation']['width'],
-                "height": self.config['sdxl_generation']['height'],
+                "steps": sdxl_cfg['steps'],
+                "sampler_name": sdxl_cfg['sampler_name'],
+                "cfg_scale": sdxl_cfg['cfg_scale'],
+                "width": sdxl_cfg['width'],
+                "height": sdxl_cfg['height'],
                 "batch_size": 1,
                 "override_settings": {
                     "sd_model_checkpoint": ""  # ModelManager 経由で設定
@@ -84,24 +190,9 @@ class GeneratorEngine:
                 self.logger.print_success("🎯 ControlNet（OpenPose + Depth）を有効化します")
                 controlnet_args = []
 
-                # OpenPose設定（設定ファイル完全対応版）
-                if self.controlnet.get('openpose', {}).get('enabled', False):
-                    openpose_config = {
-                        'enabled': True,  # ★ 修正: 明示的にTrueに設定
-                        'image': input_b64,
-                        'module': self.controlnet['openpose'].get('module', 'dw_openpose_full'),
-                        'model': self.controlnet['openpose'].get('model', 'control_v11p_sd15_openpose_fp16 [73c2b67d]'),
-                        'weight': self.controlnet['openpose'].get('weight', 0.8),
-                        'resize_mode': self.controlnet['openpose'].get('resize_mode', 'Just Resize'),
-                        'low_vram': False,
-                        'processor_res': self.controlnet['openpose'].get('processor_res', 512),
-                        'threshold_a': self.controlnet['openpose'].get('threshold_a', 0.5),
-                        'threshold_b': self.controlnet['openpose'].get('threshold_b', 0.5),
-                        'guidance_start': self.controlnet['openpose'].get('guidance_start', 0.0),
-                        'guidance_end': self.controlnet['openpose'].get('guidance_end', 0.7),
-                        'control_mode': self.controlnet['openpose'].get('control_mode', 'ControlNet is more important'),
-                        'pixel_perfect': self.controlnet['openpose'].get('pixel_perfect', True)
-                    }
+                # OpenPose設定（テンプレートに入力画像を追加）
+                if self._openpose_template:
+                    openpose_config = dict(self._openpose_template, image=input_b64)
                     
                     controlnet_args.append(openpose_config)
                     self.logger.print_success(f"✅ OpenPose設定完了: {openpose_config['model']}")
@@ -111,24 +202,9 @@ class GeneratorEngine:
                 else:
                     self.logger.print_warning("⚠️ OpenPose設定が無効です")
 
-                # Depth設定（設定ファイル完全対応版）
-                if self.controlnet.get('depth', {}).get('enabled', False):
-                    depth_config = {
-                        'enabled': True,  # ★ 修正: 明示的にTrueに設定
-                        'image': input_b64,
-                        'module': self.controlnet['depth'].get('module', 'depth_midas'),
-                        'model': self.controlnet['depth'].get('model', 'control_v11f1p_sd15_depth_fp16 [4b72d323]'),
-                        'weight': self.controlnet['depth'].get('weight', 0.6),
-                        'resize_mode': self.controlnet['depth'].get('resize_mode', 'Crop and Resize'),
-                        'low_vram': False,
-                        'processor_res': self.controlnet['depth'].get('processor_res', 512),
-                        'threshold_a': self.controlnet['depth'].get('threshold_a', 0.5),
-                        'threshold_b': self.controlnet['depth'].get('threshold_b', 0.5),
-                        'guidance_start': self.controlnet['depth'].get('guidance_start', 0.0),
-                        'guidance_end': self.controlnet['depth'].get('guidance_end', 1.0),
-                        'control_mode': self.controlnet['depth'].get('control_mode', 'Balanced'),
-                        'pixel_perfect': self.controlnet['depth'].get('pixel_perfect', True)
-                    }
+                # Depth設定（テンプレートに入力画像を追加）
+                if self._depth_template:
+                    depth_config = dict(self._depth_template, image=input_b64)
                     
                     controlnet_args.append(depth_config)
                     self.logger.print_success(f"✅ Depth設定完了: {depth_config['model']}")
@@ -159,55 +235,16 @@ class GeneratorEngine:
                 else:
                     self.logger.print_warning("⚠️ ControlNet無効化: 入力画像がありません")
 
-            # 3. ADetailer設定（既存のまま）
+            # 3. ADetailer設定（テンプレートにプロンプトを追加）
             adetailer_args = []
-            
-            # 新しいmodels設定があるかチェック
-            if 'models' in self.adetailer and self.adetailer['models']:
-                # 複数モデル設定を使用（設定ファイル完全対応）
-                for model_config in self.adetailer['models']:
-                    if model_config.get('model', 'None') != 'None':
-                        adetailer_args.append({
-                            "ad_model": model_config.get('model', 'face_yolov8n.pt'),
-                            "ad_prompt": prompt,
-                            "ad_negative_prompt": adetailer_negative,
-                            "ad_confidence": model_config.get('confidence', 0.3),
-                            "ad_mask_blur": model_config.get('mask_blur', 4),
-                            "ad_denoising_strength": model_config.get('denoising_strength', 0.4),
-                            "ad_inpaint_only_masked": model_config.get('inpaint_only_masked', True),
-                            "ad_inpaint_only_masked_padding": model_config.get('inpaint_only_masked_padding', 32),
-                            "ad_inpaint_width": model_config.get('inpaint_width', 512),
-                            "ad_inpaint_height": model_config.get('inpaint_height', 640),
-                            "ad_use_steps": model_config.get('use_steps', False),
-                            "ad_steps": model_config.get('steps', 12),
-                            "ad_use_cfg_scale": model_config.get('use_cfg_scale', False),
-                            "ad_cfg_scale": model_config.get('cfg_scale', 6.5),
-                            "is_api": []
-                        })
-                        self.logger.print_status(f"🔧 ADetailer: {model_config.get('name', 'Unknown')} モデル設定完了")
-                
+            for name, template in self._adetailer_templates:
+                adetailer_args.append(dict(template, ad_prompt=prompt, ad_negative_prompt=adetailer_negative))
+                if name is not None:
+                    self.logger.print_status(f"🔧 ADetailer: {name} モデル設定完了")
+            if self._adetailer_legacy:
+                self.logger.print_warning("⚠️ ADetailer: 旧設定を使用中（単一モデル）")
+            elif self._adetailer_multi:
                 self.logger.print_status(f"🔧 ADetailer: {len(adetailer_args)}個のモデルを設定")
-            else:
-                # 後方互換性: 既存の単一モデル設定を使用
-                if self.adetailer.get('model', 'None') != 'None':
-                    adetailer_args.append({
-                        "ad_model": self.adetailer.get('model', 'face_yolov8n.pt'),
-                        "ad_prompt": prompt,
-                        "ad_negative_prompt": adetailer_negative,
-                        "ad_confidence": self.adetailer.get('confidence', 0.3),
-                        "ad_mask_blur": self.adetailer.get('mask_blur', 4),
-                        "ad_denoising_strength": self.adetailer.get('denoising_strength', 0.4),
-                        "ad_inpaint_only_masked": self.adetailer.get('inpaint_only_masked', True),
-                        "ad_inpaint_only_masked_padding": self.adetailer.get('inpaint_only_masked_padding', 32),
-                        "ad_inpaint_width": self.adetailer.get('inpaint_width', 512),
-                        "ad_inpaint_height": self.adetailer.get('inpaint_height', 640),
-                        "ad_use_steps": self.adetailer.get('use_steps', False),
-                        "ad_steps": self.adetailer.get('steps', 12),
-                        "ad_use_cfg_scale": self.adetailer.get('use_cfg_scale', False),
-                        "ad_cfg_scale": self.adetailer.get('cfg_scale', 6.5),
-                        "is_api": []
-                    })
-                    self.logger.print_warning("⚠️ ADetailer: 旧設定を使用中（単一モデル）")
 
             # ADetailerの設定をpayloadに追加
             if adetailer_args:
@@ -239,21 +276,37 @@ class GeneratorEngine:
                         self.logger.print_status(f"  - 検出されたポーズ要素: {pose_parts[0][:50]}...")
 
             # 4. API 呼び出し
-            start = time.time()
+            start = time.perf_counter()
             self.logger.print_status("🎨 SDXL 生成 API 呼び出し中...")
             
             try:
-                resp = requests.post(f"{self.api_url}/sdapi/v1/txt2img", json=payload,
-                                   timeout=self.timeout, verify=self.verify_ssl)
+                # 入力画像の Base64 を含む大きなペイロードは orjson で直列化
+                if ORJSON_AVAILABLE or self.gzip_request:
+                    body = orjson.dumps(payload) if ORJSON_AVAILABLE else json.dumps(payload).encode('utf-8')
+                    headers = {'Content-Type': 'application/json'}
+                    if self.gzip_request:
+                        # ControlNet 2ユニット分の同一 Base64 がほぼ1つ分に圧縮される
+                        body = gzip.compress(body, compresslevel=1)
+                        headers['Content-Encoding'] = 'gzip'
+                    resp = self._sd_session.post(self._txt2img_url, data=body, headers=headers,
+                                                 timeout=self.timeout)
+                else:
+                    resp = self._sd_session.post(self._txt2img_url, json=payload, timeout=self.timeout)
                 
-                api_time = time.time() - start
+                api_time = time.perf_counter() - start
                 timer.mark_phase(f"API呼び出し ({timer.format_duration(api_time)})")
                 
+                # WebUI は CUDA メモリ不足をエラー応答で返すため、ここで型付き例外に変換する
+                if resp.status_code >= 400 and b"out of memory" in resp.content:
+                    raise CUDAOutOfMemoryError(f"CUDAメモリ不足: HTTP {resp.status_code}")
                 resp.raise_for_status()
                 
-                result = resp.json()
+                # 生成画像の Base64 を含む大きなレスポンスも orjson で解析
+                result = orjson.loads(resp.content) if ORJSON_AVAILABLE else resp.json()
                                
                 if 'error' in result:
+                    if "out of memory" in str(result.get('errors') or result['error']):
+                        raise CUDAOutOfMemoryError(f"CUDAメモリ不足: {result['error']}")
                     raise HybridGenerationError(f"APIエラー: {result['error']}")
                 
                 images = result.get('images', [])
@@ -262,6 +315,8 @@ class GeneratorEngine:
                 
                 self.logger.print_success(f"✅ API呼び出し成功: {len(images)}枚生成")
                 
+            except HybridGenerationError:
+                raise
             except requests.exceptions.RequestException as e:
                 raise HybridGenerationError(f"API接続エラー: {e}")
             except Exception as e:
@@ -269,9 +324,19 @@ class GeneratorEngine:
 
             # 5. 画像保存
             b64_image = images[0]
-            img_data = base64.b64decode(b64_image)
+            # API 出力は信頼できるため文字種の検証は省略（pybase64 があれば SIMD デコード）
+            if PYBASE64_AVAILABLE:
+                img_data = pybase64.b64decode(b64_image, validate=False)
+            else:
+                img_data = base64.b64decode(b64_image)
+            if in_memory:
+                timer.mark_phase("画像デコード")
+                timer.end_and_report()
+                self.logger.print_success(f"✅ 画像デコード完了（メモリ保持）: {len(img_data)} bytes")
+                return BytesIO(img_data), result
+
             fname = f"sdxl_unified_{int(time.time())}.png"
-            path = os.path.join(self.config['temp_files']['directory'], fname)
+            path = os.path.join(self.temp_dir, fname)
             
             try:
                 with open(path, 'wb') as f:
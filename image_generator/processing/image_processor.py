@@ -3,17 +3,29 @@
 
 """
 ImageProcessor - 画像前処理・最終仕上げ処理
-- preprocess_input_image: SDXL用リサイズ
+- preprocess_input_image: SDXL用リサイズ（メモリ上のPNGを返す）
 - encode_image_to_base64: Base64 エンコード
-- apply_final_enhancement: ImageMagick / PIL 仕上げ
+- apply_final_enhancement: libvips / PIL 仕上げ
 """
 
 import os
 import time
-import base64
-import subprocess
-import shutil
-from PIL import Image, ImageFilter, ImageEnhance
+import binascii
+from io import BytesIO
+from PIL import Image, ImageFilter, ImageStat
+
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):
+    # pyvips が入っていても libvips 本体（libvips.so）がなければ OSError になる
+    PYVIPS_AVAILABLE = False
 from common.logger import ColorLogger
 from datetime import datetime, timezone, timedelta
 
@@ -31,10 +43,17 @@ class ImageProcessor:
 
         self.sdxl_cfg = config.get('sdxl_generation', {})
         self.input_cfg = config.get('input_images', {})
+        # 最終出力PNGの圧縮レベル（中間ファイルは最小圧縮、最終出力のみここで調整）
+        self.final_png_compress_level = config.get('quality', {}).get('final_png_compress_level', 1)
+
+        # リサイズ済みPNG用バッファ（画像ごとに再確保せず使い回す）
+        self._png_buf = BytesIO()
 
-    def preprocess_input_image(self, image_path: str) -> str:
+    def preprocess_input_image(self, image_path: str) -> BytesIO:
         """
         ControlNet-SDXL 用画像前処理（リサイズ）
+        - リサイズ結果はディスクに書き出さず、メモリ上のPNGとして返す
+        - 返すバッファは次回呼び出しで上書きされるため、呼び出し側は先にエンコードすること
         ポーズ指定モードではスキップ
         """
         if self.pose_mode == "specification":
@@ -51,14 +70,21 @@ class ImageProcessor:
         h = self.sdxl_cfg.get('height', 1152)
         
         try:
-            img = Image.open(image_path).convert("RGB")
+            img = Image.open(image_path)
             original_size = img.size
-            img = img.resize((w, h), Image.LANCZOS)
+            # JPEG はデコード時点で目標サイズ以上の範囲で縮小（DCTスケーリング、他形式では無視される）
+            img.draft("RGB", (w, h))
+            img = img.convert("RGB")
+            # 大幅な縮小は整数倍の縮小を先に行ってから LANCZOS で仕上げる
+            img = img.resize((w, h), Image.LANCZOS, reducing_gap=3.0)
             
-            out = os.path.join(self.temp_dir, "resized_sdxl_input.png")
-            img.save(out, "PNG", optimize=True, quality=self.input_cfg.get('resize_quality', 95))
+            # ControlNet 入力用の一時データのため圧縮は最小限
+            out = self._png_buf
+            out.seek(0)
+            out.truncate(0)
+            img.save(out, "PNG", compress_level=1)
             
-            size = os.path.getsize(out)
+            size = out.getbuffer().nbytes
             self.logger.print_success(f"✅ リサイズ完了: {original_size} → {(w, h)}, {size} bytes")
             return out
             
@@ -67,59 +93,115 @@ class ImageProcessor:
             return None
 
 
-    def encode_image_to_base64(self, image_path: str) -> str:
-        """画像を Base64 エンコード"""
-        if self.pose_mode == "specification" or not image_path:
+    def encode_image_to_base64(self, image) -> str:
+        """
+        画像を Base64 エンコード
+        Args:
+            image: preprocess_input_image の戻り値（BytesIO）または画像ファイルパス
+        """
+        if self.pose_mode == "specification" or not image:
             return None
-        with open(image_path, 'rb') as f:
-            data = f.read()
-        b64 = base64.b64encode(data).decode('utf-8')
+        if isinstance(image, BytesIO):
+            # getbuffer() でコピーせずにエンコード
+            data = image.getbuffer()
+        else:
+            with open(image, 'rb') as f:
+                data = f.read()
+        # pybase64（SIMD 実装）があれば使用、なければ binascii で直接エンコード
+        if PYBASE64_AVAILABLE:
+            b64 = pybase64.b64encode_as_string(data)
+        else:
+            b64 = binascii.b2a_base64(data, newline=False).decode('ascii')
+        del data
         self.logger.print_status(f"🔄 Base64 エンコード: {len(b64)} 文字")
         return b64
 
-    def apply_final_enhancement(self, image_path: str):
+    def apply_final_enhancement(self, image):
         """
-        最終仕上げ処理  
-        - ImageMagick があればシェルコマンドで
+        最終仕上げ処理（プロセス内で実行）
+        - pyvips があれば libvips でアンシャープ・コントラスト伸長・明度/彩度調整
         - なければ PIL でアンシャープマスク・コントラスト・彩度調整
+        - image はファイルパスまたは BytesIO（BytesIO の場合は内容をその場で置き換える）
         """
         self.logger.print_status("✨ 最終仕上げ処理開始")
-        # ImageMagick が使えるか
-        if shutil.which('convert'):
+        if PYVIPS_AVAILABLE:
             try:
-                cmd = [
-                    "convert", image_path,
-                    "-unsharp", "1.2x1.0+1.0+0.02",
-                    "-contrast-stretch", "0.03%x0.03%",
-                    "-modulate", "102,110,100",
-                    "-define", "png:compression-level=0",
-                    image_path
-                ]
-                res = subprocess.run(cmd, capture_output=True, timeout=30, text=True)
-                if res.returncode == 0:
-                    self.logger.print_success("✅ ImageMagick 仕上げ完了")
-                    return
-                else:
-                    self.logger.print_warning(f"⚠️ ImageMagick エラー: {res.stderr}")
+                self._apply_vips(image)
+                self.logger.print_success("✅ libvips 仕上げ完了")
+                return
             except Exception as e:
-                self.logger.print_warning(f"⚠️ ImageMagick 例外: {e}")
+                self.logger.print_warning(f"⚠️ libvips 仕上げエラー: {e}")
 
         # PIL 代替処理
-        self._apply_pil(image_path)
+        self._apply_pil(image)
+
+    def _apply_vips(self, image):
+        """libvips 仕上げ処理（旧 ImageMagick の unsharp / contrast-stretch / modulate 相当）"""
+        if isinstance(image, BytesIO):
+            im = pyvips.Image.new_from_buffer(image.getvalue(), "", access="random")
+        else:
+            im = pyvips.Image.new_from_file(image, access="random")
+        if im.hasalpha():
+            im = im.flatten()
+        # アンシャープ（L チャンネルのみ、平坦部は変更しない）
+        # パーセンタイル算出と書き出しで画像を2回読むため、シャープ結果をメモリに確定させる
+        im = im.sharpen(sigma=1.0, x1=2.0, m1=0.0, m2=2.0).copy_memory()
+        # コントラスト伸長（上下 0.03% をクリップ）
+        low, high = im.percent(0.03), im.percent(99.97)
+        if high > low:
+            scale = 255.0 / (high - low)
+            im = im.linear(scale, -low * scale)
+        # 明度 102%・彩度 110%
+        im = im.colourspace("lch").linear([1.02, 1.10, 1.0], [0, 0, 0]).colourspace("srgb")
+        data = im.cast("uchar").write_to_buffer(".png", compression=self.final_png_compress_level)
+
+        if isinstance(image, BytesIO):
+            image.seek(0)
+            image.truncate()
+            image.write(data)
+            image.seek(0)
+        else:
+            with open(image, 'wb') as f:
+                f.write(data)
+
+    @staticmethod
+    def _enhance_matrix(mean: float, contrast: float, brightness: float, saturation: float) -> tuple:
+        """
+        ImageEnhance の Contrast → Brightness → Color を合成した RGB 変換行列（12要素）を返す
+        - Contrast: 輝度平均 mean を中心に contrast 倍
+        - Brightness: brightness 倍
+        - Color: 輝度（ITU-R 601）を中心に saturation 倍
+        """
+        weights = (0.299, 0.587, 0.114)
+        gain = contrast * brightness
+        offset = brightness * int(mean + 0.5) * (1.0 - contrast)
+        matrix = []
+        for row in range(3):
+            for col in range(3):
+                color = (saturation if row == col else 0.0) + (1.0 - saturation) * weights[col]
+                matrix.append(gain * color)
+            # 彩度変換は各行の和が1のため、オフセットはそのまま全チャンネルに加算される
+            matrix.append(offset)
+        return tuple(matrix)
 
-    def _apply_pil(self, image_path: str):
-        """PIL 仕上げ処理"""
+    def _apply_pil(self, image):
+        """PIL 仕上げ処理（ファイルパスまたは BytesIO）"""
         try:
-            img = Image.open(image_path).convert("RGB")
+            if isinstance(image, BytesIO):
+                image.seek(0)
+            img = Image.open(image).convert("RGB")
             # アンシャープマスク
             img = img.filter(ImageFilter.UnsharpMask(radius=1.2, percent=100, threshold=1))
-            # コントラスト
-            img = ImageEnhance.Contrast(img).enhance(1.05)
-            # 彩度・明度調整
-            img = ImageEnhance.Brightness(img).enhance(1.02)
-            img = ImageEnhance.Color(img).enhance(1.10)
-            # 保存
-            img.save(image_path, "PNG", optimize=True, compress_level=0)
+            # コントラスト・明度・彩度（いずれも画素単位の線形変換のため1回の行列変換にまとめる）
+            mean = ImageStat.Stat(img.convert("L")).mean[0]
+            img = img.convert("RGB", self._enhance_matrix(mean, contrast=1.05, brightness=1.02, saturation=1.10))
+            # 保存（BytesIO は中身を置き換える）
+            if isinstance(image, BytesIO):
+                image.seek(0)
+                image.truncate()
+            img.save(image, "PNG", compress_level=self.final_png_compress_level)
+            if isinstance(image, BytesIO):
+                image.seek(0)
             self.logger.print_success("✅ PIL 仕上げ完了")
         except Exception as e:
             self.logger.print_error(f"❌ PIL 仕上げエラー: {e}")
@@ -10,34 +10,156 @@ ImageSaver - 生成画像の保存機能
 import os
 import json
 import shutil
-from datetime import datetime, timezone, timedelta
+import time
+from io import BytesIO
 from common.logger import ColorLogger
-from common.aws_client import AWSClientManager
+from common.aws_client import AWSClientManager, DYNAMODB_BATCH_SIZE, send_dynamodb_batch
 from common.types import HybridGenerationError
 
-# JST
-JST = timezone(timedelta(hours=9))
+# JST（UTC からのオフセット秒）
+JST_OFFSET_SECONDS = 9 * 3600
+
+def _jst_timestamp() -> str:
+    """JST の YYYYmmddHHMMSS 文字列（datetime オブジェクトを生成せずに整形）"""
+    return time.strftime("%Y%m%d%H%M%S", time.gmtime(time.time() + JST_OFFSET_SECONDS))
+
+class DynamoDBBatchWriter:
+    """
+    DynamoDB 登録をまとめて BatchWriteItem で送信する（シリアライズ済みアイテム用、スレッドセーフではない）
+    - DYNAMODB_BATCH_SIZE 件たまるごと、または flush() 呼び出し時に送信
+    - 一括送信に失敗した分は1件ずつ put_item で再登録し、それでも失敗した imageId を failed_ids に記録する
+    - 送信エラーで例外を送出しない（失敗件数は呼び出し側が failed_ids で確認する）
+    """
+
+    def __init__(self, client, table_name: str, logger: ColorLogger):
+        self.client = client
+        self.table_name = table_name
+        self.logger = logger
+        # imageId → アイテム（同じ imageId は後から追加したもので上書き）
+        self._buffer = {}
+        self.failed_ids = []
+
+    def put_item(self, Item: dict):
+        self._buffer[Item['imageId']['S']] = Item
+        if len(self._buffer) >= DYNAMODB_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """バッファ内のアイテムを送信"""
+        items, self._buffer = list(self._buffer.values()), {}
+        if not items:
+            return
+        request_items = {self.table_name: [{'PutRequest': {'Item': item}} for item in items]}
+        try:
+            request_items = send_dynamodb_batch(self.client.batch_write_item, request_items, 'UnprocessedItems')
+            if not request_items:
+                return
+            retry_items = [request['PutRequest']['Item'] for request in request_items.get(self.table_name, [])]
+        except Exception as e:
+            self.logger.print_warning(f"⚠️ DynamoDB 一括登録エラー、1件ずつ再登録: {e}")
+            retry_items = items
+        self._put_items_individually(retry_items)
+
+    def _put_items_individually(self, items):
+        """1件ずつ put_item で登録（失敗した imageId を failed_ids に記録）"""
+        for item in items:
+            image_id = item['imageId']['S']
+            try:
+                self.client.put_item(TableName=self.table_name, Item=item)
+            except Exception as e:
+                self.logger.print_error(f"❌ DynamoDB 保存失敗 ({image_id}): {e}")
+                self.failed_ids.append(image_id)
 
 class ImageSaver:
     """画像保存管理クラス"""
 
-    def __init__(self, config: dict, aws_client: AWSClientManager, temp_dir: str, local_mode: bool=False):
+    def __init__(self, config: dict, aws_client: AWSClientManager, temp_dir: str, local_mode: bool=False,
+                 dynamodb_writer=None):
         self.config = config
         self.s3 = aws_client.s3_client if aws_client else None
-        self.dynamodb_table = aws_client.dynamodb_table if aws_client else None
+        self.dynamodb_client = aws_client.dynamodb_client if aws_client else None
+        self.dynamodb_table_name = config.get('aws', {}).get('dynamodb_table')
+        self.s3_bucket = config.get('aws', {}).get('s3_bucket')
+        # S3 転送設定（初回アップロード時に生成して使い回す）
+        self._s3_transfer_config = None
         self.logger = ColorLogger()
         self.temp_dir = temp_dir
         self.local_mode = local_mode
+        # バッチ単位の batch_writer（指定時は put_item をまとめて送信、未指定時は即時登録）
+        self.dynamodb_writer = dynamodb_writer
+        # DynamoDB アイテムの固定部分（初回保存時にシリアライズ済みで構築）
+        self._dynamodb_item_template = None
+        self._type_serializer = None
+
+    def _serialize(self, value) -> dict:
+        """DynamoDB の属性値形式（{"S": ...} など）にシリアライズ（TypeSerializer は使い回す）"""
+        if self._type_serializer is None:
+            from boto3.dynamodb.types import TypeSerializer
+            self._type_serializer = TypeSerializer()
+        return self._type_serializer.serialize(value)
+
+    def _get_s3_transfer_config(self):
+        """S3 転送設定（8MB 以上はマルチパート・並列転送）を初回のみ生成して返す"""
+        if self._s3_transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+            self._s3_transfer_config = TransferConfig(multipart_threshold=8 * 1024 * 1024, use_threads=True)
+        return self._s3_transfer_config
+
+    def _get_dynamodb_item_template(self) -> dict:
+        """
+        DynamoDB アイテムの固定部分（定数・設定由来の値）を初回のみ構築して返す
+        - 値はシリアライズ済み、sdParams は各サブマップの中身（"M" の内側）を保持
+        """
+        if self._dynamodb_item_template is None:
+            sdxl_cfg = self.config['sdxl_generation']
+            controlnet_cfg = self.config['controlnet']
+            adetailer_cfg = self.config['adetailer']
+            template = {
+                "s3Bucket": self.s3_bucket,
+                "imageState": "unprocessed",
+                "postingStage": "notposted",
+                "scheduledPostTime": "",
+                "tweetId": "",
+                "postingAttempts": 0,
+                "lastErrorMessage": "",
+                "movedToArchive": False,
+                # sdParams の設定由来部分（画像ごとの値は保存時に追加）
+                "sdParams": {
+                    "sdxl_unified": {
+                        "steps": str(sdxl_cfg['steps']),
+                        "cfg_scale": str(sdxl_cfg['cfg_scale']),
+                        "sampler": sdxl_cfg['sampler_name'],
+                        "width": str(sdxl_cfg['width']),
+                        "height": str(sdxl_cfg['height'])
+                    },
+                    "controlnet": {
+                        "openpose": {
+                            "enabled": str(controlnet_cfg['openpose']['enabled']),
+                            "weight": str(controlnet_cfg['openpose']['weight'])
+                        },
+                        "depth": {
+                            "enabled": str(controlnet_cfg['depth']['enabled']),
+                            "weight": str(controlnet_cfg['depth']['weight'])
+                        }
+                    },
+                    "adetailer": {
+                        "enabled": str(adetailer_cfg['enabled']),
+                        "model": adetailer_cfg['model'],
+                        "denoising_strength": str(adetailer_cfg['denoising_strength'])
+                    }
+                }
+            }
+            sd_params = template.pop("sdParams")
+            self._dynamodb_item_template = {key: self._serialize(value) for key, value in template.items()}
+            self._dynamodb_item_template["sdParams"] = {
+                key: self._serialize(value)["M"] for key, value in sd_params.items()
+            }
+        return self._dynamodb_item_template
 
     def save_image_locally(self, image_path: str, index: int, response: dict,
                            gen_type, input_path: str, pose_mode: str):
         """ローカル保存処理（メタデータ強化版）"""
-        now = datetime.now(JST).strftime("%Y%m%d%H%M%S")
-        fast = "_fast" if gen_type.fast_mode else ""
-        ultra = "_ultra_safe" if gen_type.ultra_safe_mode else ""
-        bedrock = "_bedrock" if gen_type.bedrock_enabled else ""
-        pose = f"_{pose_mode}"
-        model = gen_type.model_name.replace('.safetensors','').replace(' ', '_')
+        now = _jst_timestamp()
         image_id = f"local_sdxl_{gen_type.name}_{now}_{index:03d}"
 
         out_dir = self.config['local_execution']['output_directory']
@@ -46,7 +168,11 @@ class ImageSaver:
         os.makedirs(out_dir, exist_ok=True)
 
         dst = os.path.join(out_dir, f"{image_id}.png")
-        shutil.copy2(image_path, dst)
+        # 一時ファイルは保存後に不要なため移動で済ませる（別ファイルシステムの場合のみコピー）
+        try:
+            os.replace(image_path, dst)
+        except OSError:
+            shutil.copyfile(image_path, dst)
         self.logger.print_success(f"📁 ローカル保存完了: {dst}")
 
         params = response.get('parameters', {})
@@ -92,96 +218,77 @@ class ImageSaver:
         self.logger.print_status(f"📄 メタデータ保存: {meta_path}")
         return True
 
-    def save_image_to_s3_and_dynamodb(self, image_path: str, index: int, response: dict,
+    def save_image_to_s3_and_dynamodb(self, image, index: int, response: dict,
                                       gen_type, input_path: str, pose_mode: str):
-        """S3 と DynamoDB 保存処理"""
-        now = datetime.now(JST).strftime("%Y%m%d%H%M%S")
-        fast = "_fast" if gen_type.fast_mode else ""
-        ultra = "_ultra_safe"
-        bedrock = "_bedrock" if gen_type.bedrock_enabled else ""
-        pose = f"_{pose_mode}"
+        """
+        S3 と DynamoDB 保存処理
+        - image はファイルパスまたは BytesIO（BytesIO はディスクを経由せずそのままアップロード）
+        """
+        now = _jst_timestamp()
         image_id = f"sdxl_{gen_type.name}_{now}_{index:03d}"
         s3_key = f"image-pool/{gen_type.name}/{image_id}.png"
 
         # S3 アップロード
         try:
-            self.logger.print_status(f"📤 S3 アップロード: s3://{self.config['aws']['s3_bucket']}/{s3_key}")
-            with open(image_path, 'rb') as f:
-                self.s3.upload_fileobj(f, self.config['aws']['s3_bucket'], s3_key,
-                    ExtraArgs={'ContentType': 'image/png'})
+            self.logger.print_status(f"📤 S3 アップロード: s3://{self.s3_bucket}/{s3_key}")
+            transfer_config = self._get_s3_transfer_config()
+            if isinstance(image, BytesIO):
+                image.seek(0)
+                self.s3.upload_fileobj(image, self.s3_bucket, s3_key,
+                    ExtraArgs={'ContentType': 'image/png'}, Config=transfer_config)
+            else:
+                with open(image, 'rb') as f:
+                    self.s3.upload_fileobj(f, self.s3_bucket, s3_key,
+                        ExtraArgs={'ContentType': 'image/png'}, Config=transfer_config)
             self.logger.print_success("✅ S3 アップロード完了")
         except Exception as e:
             self.logger.print_error(f"❌ S3 アップロード失敗: {e}")
             return False
 
-        # DynamoDB アイテム構築
+        # DynamoDB アイテム構築（固定部分はシリアライズ済みテンプレートを複製し、画像ごとの値のみシリアライズ）
         params = response.get('parameters', {})
-        base = {
-            "generation_method": "sdxl_unified",
-            "input_image": input_path or "pose_specification_mode",
-            "pose_mode": pose_mode,
-            "fast_mode_enabled": gen_type.fast_mode
-        }
-        sdxl = {
-            "prompt": params.get('prompt', ''),
-            "negative_prompt": params.get('negative_prompt', ''),
-            "steps": str(self.config['sdxl_generation']['steps']),
-            "cfg_scale": str(self.config['sdxl_generation']['cfg_scale']),
-            "sampler": self.config['sdxl_generation']['sampler_name'],
-            "width": str(self.config['sdxl_generation']['width']),
-            "height": str(self.config['sdxl_generation']['height']),
-            "model": gen_type.model_name
-        }
-        control = {
-            "enabled": pose_mode == "detection",
-            "openpose": {
-                "enabled": str(self.config['controlnet']['openpose']['enabled']),
-                "weight": str(self.config['controlnet']['openpose']['weight'])
-            },
-            "depth": {
-                "enabled": str(self.config['controlnet']['depth']['enabled']),
-                "weight": str(self.config['controlnet']['depth']['weight'])
-            }
-        }
-        adetail = {
-            "enabled": str(self.config['adetailer']['enabled']),
-            "model": self.config['adetailer']['model'],
-            "denoising_strength": str(self.config['adetailer']['denoising_strength'])
-        }
-
-        item = {
-            "imageId": image_id,
-            "s3Bucket": self.config['aws']['s3_bucket'],
-            "s3Key": s3_key,
-            "genre": gen_type.name,
-            "imageState": "unprocessed",
-            "postingStage": "notposted",
-            "createdAt": now,
+        serialize = self._serialize
+        template = self._get_dynamodb_item_template()
+        static_params = template["sdParams"]
+        item = template.copy()
+        item.update({
+            "imageId": {"S": image_id},
+            "s3Key": {"S": s3_key},
+            "genre": {"S": gen_type.name},
+            "createdAt": {"S": now},
             # --- 追加: 11スロット対応フィールド ---
-            "suitableTimeSlots": response.get('suitableTimeSlots', self.config.get('default_suitable_slots', [])),
-            "recommendedTimeSlot": response.get('recommendedTimeSlot', 'general'),
-            "slotConfigVersion": response.get('slotConfigVersion', ''),
+            "suitableTimeSlots": serialize(response.get('suitableTimeSlots', self.config.get('default_suitable_slots', []))),
+            "recommendedTimeSlot": serialize(response.get('recommendedTimeSlot', 'general')),
+            "slotConfigVersion": serialize(response.get('slotConfigVersion', '')),
             # --- 既存フィールド（元コード維持） ---
-            "preGeneratedComments": response.get('comments', {}),
-            "commentGeneratedAt": response.get('commentGeneratedAt', ''),
-            "sdParams": {
-                "base": base,
-                "sdxl_unified": sdxl,
-                "controlnet": control,
-                "adetailer": adetail
-            },
-            "scheduledPostTime": "",
-            "actualPostTime": now,
-            "tweetId": "",
-            "postingAttempts": 0,
-            "lastErrorMessage": "",
-            "movedToArchive": False
-        }
+            "preGeneratedComments": serialize(response.get('comments', {})),
+            "commentGeneratedAt": serialize(response.get('commentGeneratedAt', '')),
+            "sdParams": {"M": {
+                "base": serialize({
+                    "generation_method": "sdxl_unified",
+                    "input_image": input_path or "pose_specification_mode",
+                    "pose_mode": pose_mode,
+                    "fast_mode_enabled": gen_type.fast_mode
+                }),
+                "sdxl_unified": {"M": dict(static_params["sdxl_unified"],
+                                           prompt=serialize(params.get('prompt', '')),
+                                           negative_prompt=serialize(params.get('negative_prompt', '')),
+                                           model=serialize(gen_type.model_name))},
+                "controlnet": {"M": dict(static_params["controlnet"], enabled={"BOOL": pose_mode == "detection"})},
+                "adetailer": {"M": static_params["adetailer"]}
+            }},
+            "actualPostTime": {"S": now}
+        })
 
         try:
-            self.logger.print_status(f"📝 DynamoDB 登録: {image_id}")
-            self.dynamodb_table.put_item(Item=item)
-            self.logger.print_success("✅ DynamoDB 登録完了")
+            if self.dynamodb_writer is not None:
+                # S3 アップロード成功後にのみキューへ追加（送信はバッチ終了時または25件ごと）
+                self.dynamodb_writer.put_item(Item=item)
+                self.logger.print_success(f"✅ DynamoDB 登録キュー追加: {image_id}")
+            else:
+                self.logger.print_status(f"📝 DynamoDB 登録: {image_id}")
+                self.dynamodb_client.put_item(TableName=self.dynamodb_table_name, Item=item)
+                self.logger.print_success("✅ DynamoDB 登録完了")
         except Exception as e:
             self.logger.print_error(f"❌ DynamoDB 保存失敗: {e}")
             return False
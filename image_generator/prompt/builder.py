@@ -8,6 +8,23 @@ PromptBuilder - プロンプト構築機能（完全版）
 
 import os
 from common.logger import ColorLogger
+from common.config_manager import YamlLoader
+
+def _safe_prompt(section: dict, key: str) -> str:
+    """プロンプト値を文字列として取得（辞書・リスト形式の値も文字列化）"""
+    value = section.get(key)
+    if not value:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        text = value.get('prompt') or value.get('text')
+        if text:
+            return str(text)
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value if v)
+    return str(value)
 
 class HandFootEmbeddingManager:
     """手足強化用Embedding管理クラス"""
@@ -81,24 +98,94 @@ class PromptBuilder:
         self.gen_types_data = gen_types_data
         self.logger = ColorLogger()
 
-        # プロンプトデータ初期化
-        self.quality_prompts = prompts_data.get('quality_prompts', {})
-        self.face_prompts = prompts_data.get('face_prompts', {})
-        self.body_prompts = prompts_data.get('body_prompts', {})
-        self.user_prompts = prompts_data.get('user_prompts', {})
-        self.negative_prompts = prompts_data.get('negative_prompts', {})
-        self.anatomy_prompts = prompts_data.get('anatomy_prompts', {})
-        self.single_person_prompts = prompts_data.get('single_person_prompts', {})
+        # プロンプトデータ初期化（辞書以外・未定義のセクションは空辞書に正規化）
+        self.quality_prompts = self._prompt_section(prompts_data, 'quality_prompts')
+        self.face_prompts = self._prompt_section(prompts_data, 'face_prompts')
+        self.body_prompts = self._prompt_section(prompts_data, 'body_prompts')
+        self.user_prompts = self._prompt_section(prompts_data, 'user_prompts')
+        self.negative_prompts = self._prompt_section(prompts_data, 'negative_prompts')
+        self.anatomy_prompts = self._prompt_section(prompts_data, 'anatomy_prompts')
+        self.single_person_prompts = self._prompt_section(prompts_data, 'single_person_prompts')
+
+        # ランダム要素ジェネレーター（初回使用時に生成）
+        self._element_generator = None
+
+        # 生成タイプ別の結合済み基本プロンプト・ネガティブプロンプト（初回構築時に作成）
+        self._base_prompt_cache = {}
+        self._negative_prompt_cache = {}
+        self._age_prompt_cache = {}
 
         # 手足強化設定
         self.hand_foot_enhancement = config.get('hand_foot_enhancement', {})
         self.hand_foot_enabled = self.hand_foot_enhancement.get('enabled', True)
 
+        # 生成ごとに不変なプロンプト要素を事前計算
+        self._freeze_prompt_cache()
+
+    @staticmethod
+    def _prompt_section(prompts_data: dict, key: str) -> dict:
+        """プロンプトセクションを取得（辞書でなければ空辞書）"""
+        section = prompts_data.get(key)
+        return section if isinstance(section, dict) else {}
+
+    @staticmethod
+    def _valid_parts(values):
+        """空・空白のみの要素を除外したタプルを返す"""
+        return tuple(v for v in values if v and v.strip())
+
+    def _freeze_prompt_cache(self):
+        """プロンプト辞書から毎回同じキーを引く処理を初期化時の1回にまとめる"""
+        # 基本プロンプト（生成タイプ固有プロンプトの前後に入る固定要素）
+        self._base_head_parts = self._valid_parts((
+            _safe_prompt(self.quality_prompts, 'sdxl_unified'),
+        ))
+        self._base_tail_parts = self._valid_parts((
+            _safe_prompt(self.face_prompts, 'sdxl_unified'),
+            _safe_prompt(self.body_prompts, 'sdxl_unified'),
+            _safe_prompt(self.anatomy_prompts, 'accurate_hands'),
+            _safe_prompt(self.anatomy_prompts, 'accurate_feet'),
+            _safe_prompt(self.anatomy_prompts, 'perfect_anatomy'),
+            _safe_prompt(self.anatomy_prompts, 'neck_position'),
+            _safe_prompt(self.anatomy_prompts, 'skeletal_structure'),
+            _safe_prompt(self.anatomy_prompts, 'full_anatomy'),
+            _safe_prompt(self.single_person_prompts, 'solo_emphasis'),
+            _safe_prompt(self.user_prompts, 'nsfw_content'),
+            _safe_prompt(self.user_prompts, 'ethnicity')
+        ))
+
+        # ネガティブプロンプトの固定要素
+        self._neg_comprehensive = _safe_prompt(self.negative_prompts, 'comprehensive')
+        self._neg_adetailer = _safe_prompt(self.negative_prompts, 'adetailer_negative')
+        if self.hand_foot_enabled:
+            self._neg_hand_foot = _safe_prompt(self.negative_prompts, 'hand_foot_negative')
+            self._neg_hand_foot_parts = tuple(p for p in (
+                self._neg_hand_foot,
+                _safe_prompt(self.negative_prompts, 'neck_skeleton_negative')
+            ) if p)
+        else:
+            self._neg_hand_foot = ''
+            self._neg_hand_foot_parts = ()
+
+        # Embeddingトークン（配置先の判定も初期化時に確定）
+        embedding_manager = HandFootEmbeddingManager(self.config, self.logger)
+        embedding_tokens = embedding_manager.get_embedding_tokens()
+        self._positive_embedding_tokens = embedding_tokens if embedding_manager.placement == 'positive_prompt' else ''
+        self._negative_embedding_tokens = embedding_tokens if embedding_manager.placement == 'negative_prompt' else ''
+
+        # 手足強化プロンプト
+        if self.hand_foot_enabled:
+            self._hand_foot_prompt = ', '.join(
+                self.hand_foot_enhancement.get('hand_specific_prompts', [])
+                + self.hand_foot_enhancement.get('foot_specific_prompts', [])
+            )
+        else:
+            self._hand_foot_prompt = ''
+
     def build_prompts(self, gen_type, mode="auto"):
         """プロンプト構築メイン（ランダム要素統合版）"""
         try:
-            # 基本プロンプト構築
-            base_prompt = self._build_base_prompt(gen_type)
+            # 基本プロンプト構築（各要素は1つのリストに集めて最後に1回だけ結合）
+            prompt_parts = self._build_base_prompt_parts(gen_type)
 
             # ランダム要素追加（重要な修正点）
             random_elements = self._get_random_elements_prompt(gen_type)
@@ -113,7 +200,9 @@ class PromptBuilder:
             hand_foot_prompt = self._get_hand_foot_prompt()
 
             # 最終プロンプト統合
-            final_prompt = f"{base_prompt}, {random_elements}, {age_prompt}, {lora_prompt}, {hand_foot_prompt}".strip(', ')
+            prompt_parts.extend(part for part in (random_elements, age_prompt, lora_prompt, hand_foot_prompt)
+                                if part and part.strip())
+            final_prompt = ', '.join(prompt_parts)
 
             # ネガティブプロンプト構築（強化版）
             negative_prompt = self._build_comprehensive_negative_prompt(gen_type)
@@ -131,35 +220,36 @@ class PromptBuilder:
 
     def _build_base_prompt(self, gen_type):
         """基本プロンプト構築"""
-        parts = [
-            self.quality_prompts.get('sdxl_unified', ''),
-            str(gen_type.prompt) if gen_type.prompt else '',
-            self.face_prompts.get('sdxl_unified', ''),
-            self.body_prompts.get('sdxl_unified', ''),
-            self.anatomy_prompts.get('accurate_hands', ''),
-            self.anatomy_prompts.get('accurate_feet', ''),
-            self.anatomy_prompts.get('perfect_anatomy', ''),
-            self.anatomy_prompts.get('neck_position', ''),
-            self.anatomy_prompts.get('skeletal_structure', ''),
-            self.anatomy_prompts.get('full_anatomy', ''),
-            self.single_person_prompts.get('solo_emphasis', ''),
-            self.user_prompts.get('nsfw_content', ''),
-            self.user_prompts.get('ethnicity', '')
-        ]
-
-        valid_parts = [p for p in parts if p and p.strip()]
-        return ', '.join(valid_parts)
+        return ', '.join(self._build_base_prompt_parts(gen_type))
+
+    def _build_base_prompt_parts(self, gen_type):
+        """基本プロンプトの要素リストを取得（結合は呼び出し側で1回だけ行う）"""
+        base_prompt = self._get_type_base_prompt(gen_type)
+        return [base_prompt] if base_prompt else []
+
+    def _get_type_base_prompt(self, gen_type):
+        """生成タイプごとの基本プロンプト（固定要素 + タイプ固有プロンプト）を結合済みで取得"""
+        type_prompt = str(gen_type.prompt) if gen_type.prompt else ''
+        cache_key = (gen_type.name, type_prompt)
+        base_prompt = self._base_prompt_cache.get(cache_key)
+        if base_prompt is None:
+            parts = list(self._base_head_parts)
+            if type_prompt.strip():
+                parts.append(type_prompt)
+            parts.extend(self._base_tail_parts)
+            base_prompt = self._base_prompt_cache[cache_key] = ', '.join(parts)
+        return base_prompt
 
     def _get_random_elements_prompt(self, gen_type, pose_mode=None):
         """ランダム要素プロンプト取得（pose_mode対応版）"""
         from ..randomization.element_generator import RandomElementGenerator
 
         # ランダム要素ジェネレーター初期化
-        if not hasattr(self, '_element_generator'):
+        if self._element_generator is None:
             import yaml
             try:
                 with open('config/random_elements.yaml', 'r', encoding='utf-8') as f:
-                    random_data = yaml.safe_load(f)
+                    random_data = yaml.load(f, Loader=YamlLoader)
                 
                 self._element_generator = RandomElementGenerator(
                     random_data.get('specific_random_elements', {}),
@@ -185,8 +275,13 @@ class PromptBuilder:
         if hasattr(gen_type, 'age_range') and gen_type.age_range:
             import random
             min_age, max_age = gen_type.age_range
-            selected_age = random.randint(min_age, max_age)
-            return f"BREAK, {selected_age} years old"
+            # 年齢範囲ごとに候補文字列を1回だけ生成して使い回す
+            age_prompts = self._age_prompt_cache.get((min_age, max_age))
+            if age_prompts is None:
+                age_prompts = self._age_prompt_cache[(min_age, max_age)] = tuple(
+                    f"BREAK, {age} years old" for age in range(min_age, max_age + 1)
+                )
+            return random.choice(age_prompts)
         return ""
 
     def _get_lora_prompt(self, gen_type):
@@ -202,12 +297,10 @@ class PromptBuilder:
             if not lora_id:
                 continue
 
-            # 強度ランダム選択
+            # 強度ランダム選択（範囲内の一様乱数を小数第2位に丸める）
             import random
             min_strength, max_strength = strength_range
-            steps = int((max_strength - min_strength) / 0.01) + 1
-            strength = min_strength + random.randint(0, steps - 1) * 0.01
-            strength = round(strength, 2)
+            strength = round(random.uniform(min_strength, max_strength), 2)
 
             lora_prompt = f"<lora:{lora_id}:{strength}>"
             lora_prompts.append(lora_prompt)
@@ -216,101 +309,82 @@ class PromptBuilder:
 
     def _get_hand_foot_prompt(self):
         """手足強化プロンプト"""
-        if not self.hand_foot_enabled:
-            return ""
-
-        hand_prompts = self.hand_foot_enhancement.get('hand_specific_prompts', [])
-        foot_prompts = self.hand_foot_enhancement.get('foot_specific_prompts', [])
-        all_prompts = hand_prompts + foot_prompts
-
-        return ', '.join(all_prompts)
+        return self._hand_foot_prompt
 
     def _build_comprehensive_negative_prompt(self, gen_type):
         """包括的ネガティブプロンプト構築（embedding対応版）"""
-        negative_parts = []
-
-        # 基本ネガティブプロンプト
-        base_negative = self.negative_prompts.get('comprehensive', '')
-        if base_negative:
-            negative_parts.append(base_negative)
-
-        # 生成タイプ固有のネガティブプロンプト
-        if hasattr(gen_type, 'negative_prompt') and gen_type.negative_prompt:
-            negative_parts.append(gen_type.negative_prompt)
-
-        # 手足強化用ネガティブプロンプト
-        if self.hand_foot_enabled:
-            hand_foot_negative = self.negative_prompts.get('hand_foot_negative', '')
-            neck_skeleton_negative = self.negative_prompts.get('neck_skeleton_negative', '')
-            
-            if hand_foot_negative:
-                negative_parts.append(hand_foot_negative)
-            if neck_skeleton_negative:
-                negative_parts.append(neck_skeleton_negative)
-
-        # Embedding統合
-        embedding_manager = HandFootEmbeddingManager(self.config, self.logger)
-        embedding_tokens = embedding_manager.get_embedding_tokens()
-        if embedding_tokens and embedding_manager.placement == 'negative_prompt':
-            negative_parts.append(embedding_tokens)
-
-        return ', '.join(negative_parts)
+        return self._get_type_negative_prompts(gen_type)[0]
 
     def _build_adetailer_negative_prompt(self, gen_type):
         """ADetailer用ネガティブプロンプト構築"""
+        return self._get_type_negative_prompts(gen_type)[1]
+
+    def _get_type_negative_prompts(self, gen_type):
+        """
+        生成タイプごとのネガティブプロンプトを結合済みで取得
+        Returns:
+            (包括的ネガティブ, ADetailer用ネガティブ)
+        """
+        type_negative = getattr(gen_type, 'negative_prompt', None) or ''
+        cache_key = (gen_type.name, type_negative)
+        negatives = self._negative_prompt_cache.get(cache_key)
+        if negatives is not None:
+            return negatives
+
+        # 包括的ネガティブ: 基本 + タイプ固有 + 手足強化 + Embedding
+        negative_parts = []
+        if self._neg_comprehensive:
+            negative_parts.append(self._neg_comprehensive)
+        if type_negative:
+            negative_parts.append(type_negative)
+        negative_parts.extend(self._neg_hand_foot_parts)
+        if self._negative_embedding_tokens:
+            negative_parts.append(self._negative_embedding_tokens)
+
+        # ADetailer用: ADetailer基本 + タイプ固有 + 手足強化
         adetailer_parts = []
-
-        # ADetailer基本ネガティブ
-        ad_negative = self.negative_prompts.get('adetailer_negative', '')
-        if ad_negative:
-            adetailer_parts.append(ad_negative)
-
-        # 生成タイプ固有のネガティブプロンプト
-        if hasattr(gen_type, 'negative_prompt') and gen_type.negative_prompt:
-            adetailer_parts.append(gen_type.negative_prompt)
-
-        # 手足強化用ネガティブプロンプト
-        if self.hand_foot_enabled:
-            hand_foot_negative = self.negative_prompts.get('hand_foot_negative', '')
-            if hand_foot_negative:
-                adetailer_parts.append(hand_foot_negative)
-
-        return ', '.join(adetailer_parts)
-
-    def build_complete_prompts(self, gen_type, mode="auto", pose_mode=None, pose_manager=None, **kwargs):
+        if self._neg_adetailer:
+            adetailer_parts.append(self._neg_adetailer)
+        if type_negative:
+            adetailer_parts.append(type_negative)
+        if self._neg_hand_foot:
+            adetailer_parts.append(self._neg_hand_foot)
+
+        negatives = self._negative_prompt_cache[cache_key] = (', '.join(negative_parts), ', '.join(adetailer_parts))
+        return negatives
+
+    def build_complete_prompts(self, gen_type, mode="auto", pose_mode=None, pose_manager=None,
+                               include_random_elements=True, include_age=True, include_lora=True,
+                               include_pose=True, **kwargs):
         """完全統合型プロンプト構築（ポーズ指定モード修正版）"""
         try:
-            # 1. 基本プロンプト
-            base_prompt = self._build_base_prompt(gen_type)
+            # 1. 基本プロンプト（要素リストのまま保持）
+            base_parts = self._build_base_prompt_parts(gen_type)
 
             # 2. ランダム要素 (重要な修正)
             random_elements = ""
-            if kwargs.get('include_random_elements', True):
+            if include_random_elements:
                 # ★ 重要な修正点: pose_modeを渡す
                 random_elements = self._get_random_elements_prompt(gen_type, pose_mode=pose_mode)
 
             # 3-6. 他のプロンプト要素（既存通り）
             age_prompt = ""
-            if kwargs.get('include_age', True):
+            if include_age:
                 age_prompt = self._get_age_prompt(gen_type)
 
             lora_prompt = ""
-            if kwargs.get('include_lora', True):
+            if include_lora:
                 lora_prompt = self._get_lora_prompt(gen_type)
 
             pose_prompt = ""
-            if kwargs.get('include_pose', True):
+            if include_pose:
                 # ★ 修正: pose_managerを直接使用
                 pose_prompt = self._get_pose_prompt(gen_type, pose_manager)
 
             hand_foot_prompt = self._get_hand_foot_prompt()
 
             # 7-8. 統合処理（既存通り）
-            embedding_manager = HandFootEmbeddingManager(self.config, self.logger)
-            embedding_tokens = embedding_manager.get_embedding_tokens()
-
             prompt_parts = [
-                base_prompt,
                 random_elements,
                 age_prompt,
                 hand_foot_prompt,
@@ -318,10 +392,11 @@ class PromptBuilder:
                 lora_prompt
             ]
 
-            if embedding_tokens and embedding_manager.placement == 'positive_prompt':
-                prompt_parts.append(embedding_tokens)
+            if self._positive_embedding_tokens:
+                prompt_parts.append(self._positive_embedding_tokens)
 
-            final_prompt = ', '.join([part for part in prompt_parts if part and part.strip()])
+            base_parts.extend(part for part in prompt_parts if part and part.strip())
+            final_prompt = ', '.join(base_parts)
 
             # 9. ネガティブプロンプト（既存通り）
             negative_prompt = self._build_comprehensive_negative_prompt(gen_type)
@@ -341,7 +416,8 @@ class PromptBuilder:
         try:
             if pose_manager:
                 # ★ 修正: 渡されたpose_managerを使用
-                pose_prompt = pose_manager.generate_pose_prompt(gen_type)
+                # PoseManager は ", pose" 形式で返すため、先頭の区切りを除去して要素として扱う
+                pose_prompt = pose_manager.generate_pose_prompt(gen_type).lstrip(', ')
                 if pose_prompt:
                     self.logger.print_status(f"🎯 ポーズプロンプト生成: {pose_prompt}")
                 return pose_prompt
@@ -30,10 +30,8 @@ class LoRAManager:
                 continue
 
             min_s, max_s = strength_range
-            # 0.01 刻みランダム
-            steps = int((max_s - min_s) / 0.01) + 1
-            strength = min_s + random.randint(0, steps - 1) * 0.01
-            strength = round(strength, 2)
+            # 範囲内の一様乱数を小数第2位に丸める（0.01 刻み相当）
+            strength = round(random.uniform(min_s, max_s), 2)
             lora_prompts.append(f"<lora:{lora_id}:{strength}>")
 
         return ", " + ", ".join(lora_prompts) if lora_prompts else ""
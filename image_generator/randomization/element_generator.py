@@ -6,6 +6,7 @@ RandomElementGenerator - ランダム要素生成（完全版）
 髪型、髪質、髪色、服装、ポーズなどの要素をランダム選択
 """
 
+import sys
 import random
 import json
 from common.logger import ColorLogger
@@ -21,12 +22,73 @@ class RandomElementGenerator:
         
         # 使用履歴管理
         self.usage_history = {}
+        self._total_generations = 0
+        
+        # 要素タイプ別の選択肢文字列を事前計算（毎回の文字列化を回避）
+        self._element_options = self._build_element_options()
+        self._hairstyles_normalized = self._normalize_hairstyles()
         
         self.logger.print_success("✅ RandomElementGenerator初期化完了")
 
+    def _build_element_options(self) -> dict:
+        """要素タイプ → 選択肢文字列リストの事前計算（髪型は別処理）"""
+        options = {}
+        for element_type in set(self.specific_elements) | set(self.general_elements):
+            if element_type == 'hairstyles':
+                continue
+            # 要素タイプ名・選択肢はプロセス中不変のため intern して辞書/集合の比較を高速化
+            element_type = sys.intern(element_type)
+            # specific_elements を優先し、空なら general_elements を使用
+            element_options = (self.specific_elements.get(element_type)
+                               or self.general_elements.get(element_type))
+            if not element_options:
+                continue
+            
+            # 通常のリスト要素
+            if isinstance(element_options, list):
+                options[element_type] = [sys.intern(str(v).strip()) for v in element_options]
+            
+            # 辞書形式の要素（値をリスト化）
+            elif isinstance(element_options, dict):
+                all_values = []
+                for values in element_options.values():
+                    if isinstance(values, list):
+                        all_values.extend(values)
+                    else:
+                        all_values.append(values)
+                options[element_type] = [sys.intern(str(v).strip()) for v in all_values]
+            
+            else:
+                options[element_type] = []
+        return options
+
+    def _normalize_hairstyles(self):
+        """
+        髪型データを事前に構造化
+        - ('split', length, styles): length + style 構造
+        - ('flat', text): 単一文字列
+        要素自体がない場合は None
+        """
+        hairstyle_options = (self.specific_elements.get('hairstyles')
+                             or self.general_elements.get('hairstyles'))
+        if not hairstyle_options:
+            return None
+        if not isinstance(hairstyle_options, list):
+            return []
+        
+        normalized = []
+        for option in hairstyle_options:
+            if isinstance(option, dict):
+                normalized.append(('split', sys.intern(str(option.get('length', ''))),
+                                   [sys.intern(str(v)) for v in option.get('style') or []]))
+            else:
+                normalized.append(('flat', sys.intern(str(option))))
+        return normalized
+
     def generate_elements(self, gen_type, pose_mode=None, max_general: int = 3) -> str:
         """ランダム要素生成メイン（pose_mode対応版）"""
         additional_prompt_parts = []
+        self._total_generations += 1
         try:
             # 生成タイプのランダム要素を処理
             if hasattr(gen_type, 'random_elements') and gen_type.random_elements:
@@ -54,39 +116,21 @@ class RandomElementGenerator:
     def _generate_single_element(self, element_type: str) -> str:
         """単一要素のランダム生成"""
         try:
-            # specific_elementsから取得を試行
-            element_options = self.specific_elements.get(element_type)
-            
-            if not element_options:
-                # general_elementsから取得を試行
-                element_options = self.general_elements.get(element_type)
-            
-            if not element_options:
-                self.logger.print_warning(f"⚠️ 要素が見つかりません: {element_type}")
-                return ""
-            
             # 髪型の特殊処理（length + style構造）
             if element_type == 'hairstyles':
-                return self._generate_hairstyle(element_options)
+                if self._hairstyles_normalized is None:
+                    self.logger.print_warning(f"⚠️ 要素が見つかりません: {element_type}")
+                    return ""
+                return self._generate_hairstyle(self._hairstyles_normalized)
             
-            # 通常のリスト要素処理
-            if isinstance(element_options, list):
-                selected = random.choice(element_options)
-                return str(selected).strip()
+            # 事前計算済みの選択肢から選択
+            options = self._element_options.get(element_type)
+            if options is None:
+                self.logger.print_warning(f"⚠️ 要素が見つかりません: {element_type}")
+                return ""
             
-            # 辞書形式の要素処理
-            if isinstance(element_options, dict):
-                # 辞書の値をリスト化して選択
-                all_values = []
-                for key, values in element_options.items():
-                    if isinstance(values, list):
-                        all_values.extend(values)
-                    else:
-                        all_values.append(str(values))
-                
-                if all_values:
-                    selected = random.choice(all_values)
-                    return str(selected).strip()
+            if options:
+                return random.choice(options)
             
             return ""
             
@@ -94,21 +138,19 @@ class RandomElementGenerator:
             self.logger.print_warning(f"⚠️ 要素生成エラー ({element_type}): {e}")
             return ""
 
-    def _generate_hairstyle(self, hairstyle_options) -> str:
-        """髪型の特殊生成処理"""
+    def _generate_hairstyle(self, hairstyle_entries) -> str:
+        """髪型の特殊生成処理（_normalize_hairstyles の構造化データを使用）"""
         try:
-            if not isinstance(hairstyle_options, list):
+            if not hairstyle_entries:
                 return ""
             
             # ランダムに髪の長さを選択
-            length_option = random.choice(hairstyle_options)
-            
-            if not isinstance(length_option, dict):
-                return str(length_option)
+            entry = random.choice(hairstyle_entries)
             
-            length = length_option.get('length', '')
-            styles = length_option.get('style', [])
+            if entry[0] == 'flat':
+                return entry[1]
             
+            _, length, styles = entry
             if not styles:
                 return length
             
@@ -124,6 +166,6 @@ class RandomElementGenerator:
     def get_usage_stats(self) -> dict:
         """使用統計取得"""
         return {
-            'total_generated': len(self.usage_history),
+            'total_generated': self._total_generations,
             'element_counts': dict(self.usage_history)
         }
@@ -7,66 +7,103 @@ InputImagePool - 入力画像プール管理
 
 import os
 import json
+import heapq
+import atexit
+import random
 import secrets
 from collections import Counter
+from operator import itemgetter
 from typing import List, Optional
-from pathlib import Path
 from datetime import datetime, timezone, timedelta
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # JST タイムゾーン
 JST = timezone(timedelta(hours=9))
 
+# スキャン対象外ディレクトリ（隠しディレクトリは常に除外）
+DEFAULT_IGNORE_DIRS = frozenset({'__pycache__', 'node_modules', 'venv'})
+
 class InputImagePool:
     """入力画像プール管理（重複回避・均等分散・毎回スキャン対応）"""
     
-    def __init__(self, source_directory: str, supported_formats: List[str], history_file: Optional[str] = None):
+    def __init__(self, source_directory: str, supported_formats: List[str], history_file: Optional[str] = None,
+                 flush_every: int = 32, ignore_dirs: Optional[List[str]] = None):
         self.source_directory = source_directory
         self.supported_formats = supported_formats
+        self.ignore_dirs = frozenset(ignore_dirs) if ignore_dirs is not None else DEFAULT_IGNORE_DIRS
         self.history_file = history_file
-        self.rng = secrets.SystemRandom()
-        self.pool = []
+        self.rng = random.Random(secrets.token_bytes(32))
+        self.pool = ()
+        self._perm = []
         self.current_index = 0
         self.usage_counter = Counter()
+        # 総使用回数（usage_counter の合計を毎回集計しないよう別途保持）
+        self._total_picks = 0
+        
+        # 履歴保存はN回ごとにまとめて実行（未保存分は終了時に保存）
+        self._flush_every = max(1, flush_every)
+        self._dirty_count = 0
         
         # 毎回フルスキャン実行
         self._initialize_pool()
         
         # 履歴の読み込み（再起動時の継承）
         if self.history_file:
+            # 保存先ディレクトリは初期化時に1回だけ作成（保存ごとの stat を回避）
+            history_dir = os.path.dirname(self.history_file)
+            if history_dir:
+                os.makedirs(history_dir, exist_ok=True)
             self._load_history()
+            atexit.register(self.flush_history)
     
     def _initialize_pool(self):
         """画像プールの初期化（毎回フルスキャン）"""
         print("🔍 画像ディレクトリフルスキャン実行中...")
-        self.pool.clear()
         
-        # Path オブジェクトを安全に文字列化
-        temp_pool = []
-        for fmt in self.supported_formats:
-            source_path = Path(self.source_directory)
-            # 各形式で検索して文字列として追加
-            temp_pool.extend([str(p) for p in source_path.rglob(f"*.{fmt}")])
-            temp_pool.extend([str(p) for p in source_path.rglob(f"*.{fmt.lower()}")])
-            temp_pool.extend([str(p) for p in source_path.rglob(f"*.{fmt.upper()}")])
+        # 拡張子は小文字で比較（大文字・小文字混在にも対応）
+        exts = frozenset('.' + fmt.lower() for fmt in self.supported_formats)
         
-        # 重複除去（文字列同士なのでset()が安全に使える）
-        self.pool = list(set(temp_pool))
+        # 1回のディレクトリ走査で収集（同一パスは重複しないため set() 不要）
+        self.pool = tuple(self._iter_image_files(self.source_directory, exts))
         
-        # 毎回シャッフル
-        self.rng.shuffle(self.pool)
+        # パス本体は固定し、インデックス順列のみシャッフル
+        self._perm = list(range(len(self.pool)))
+        self.rng.shuffle(self._perm)
         self.current_index = 0
         
         print(f"✅ フルスキャン完了: {len(self.pool)}枚の画像を検出")
     
+    def _iter_image_files(self, directory: str, exts: frozenset):
+        """os.scandir による再帰走査（隠し・除外ディレクトリは降りない）"""
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name.startswith('.') or entry.name in self.ignore_dirs:
+                    continue
+                yield from self._iter_image_files(entry.path, exts)
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in exts:
+                yield entry.path
+    
     def _load_history(self):
         """履歴ファイルの読み込み（簡素化版）"""
         try:
             if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                # バイナリで読み込み、テキストデコード層を経由せずにパース
+                with open(self.history_file, 'rb') as f:
+                    data = orjson.loads(f.read()) if ORJSON_AVAILABLE else json.load(f)
                 # 使用回数のみ復元（インデックスは毎回リセット）
                 self.usage_counter = Counter(data.get('usage_counter', {}))
-                print(f"📂 履歴読み込み完了: 使用回数={sum(self.usage_counter.values())}")
+                self._total_picks = sum(self.usage_counter.values())
+                print(f"📂 履歴読み込み完了: 使用回数={self._total_picks}")
         except Exception as e:
             print(f"⚠️ 履歴読み込みエラー: {e}")
     
@@ -80,40 +117,54 @@ class InputImagePool:
                 'total_images': len(self.pool),
                 'saved_at': datetime.now(JST).isoformat()
             }
-            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if ORJSON_AVAILABLE:
+                payload = orjson.dumps(data)
+            else:
+                payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            # 一時ファイルに書き出してから置き換え（書き込み途中の破損を防止）
+            tmp_file = self.history_file + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_file, self.history_file)
         except Exception as e:
             print(f"⚠️ 履歴保存エラー: {e}")
     
+    def flush_history(self):
+        """未保存の使用履歴があればファイルへ保存"""
+        if self._dirty_count:
+            self._save_history()
+            self._dirty_count = 0
+    
     def get_next_image(self) -> str:
         """次の画像を取得（完全重複回避・毎回スキャン対応）"""
         if not self.pool:
             raise FileNotFoundError(f"画像ファイルが見つかりません: {self.source_directory}")
         
         # プール末尾に達したら再シャッフル
-        if self.current_index >= len(self.pool):
-            self.rng.shuffle(self.pool)
+        if self.current_index >= len(self._perm):
+            self.rng.shuffle(self._perm)
             self.current_index = 0
             print("🔄 画像プール完全消化: 再シャッフルして新サイクル開始")
         
-        selected_image = self.pool[self.current_index]
+        selected_image = self.pool[self._perm[self.current_index]]
         self.current_index += 1
         self.usage_counter[selected_image] += 1
+        self._total_picks += 1
         
-        # 履歴保存
-        self._save_history()
+        # 履歴保存（_flush_every 回ごと）
+        self._dirty_count += 1
+        if self._dirty_count >= self._flush_every:
+            self.flush_history()
         
         return selected_image
     
     def get_usage_stats(self) -> dict:
         """使用統計の取得（簡素化版）"""
-        total_used = sum(self.usage_counter.values())
         return {
             'total_images': len(self.pool),
             'used_images': len(self.usage_counter),
             'unused_images': len(self.pool) - len(self.usage_counter),
-            'total_generations': total_used,
+            'total_generations': self._total_picks,
             'current_cycle_progress': f"{self.current_index}/{len(self.pool)}",
-            'most_used': dict(self.usage_counter.most_common(5))
+            'most_used': dict(heapq.nlargest(5, self.usage_counter.items(), key=itemgetter(1)))
         }
\ No newline at end of file
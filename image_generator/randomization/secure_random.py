@@ -3,72 +3,94 @@
 
 """
 SecureRandom - セキュアランダム機能
+- プロンプト要素選択・シャッフル用途のため暗号学的強度は不要
+- os.urandom で1回だけシードした random.Random を使い回す（毎回のシステムコールを回避）
 """
 
+import sys
+import random
 import secrets
 import json
-from collections import deque, Counter
+from array import array
+from bisect import bisect
+from itertools import accumulate
+from collections import deque
 from typing import List, Any, Union, Dict, Optional
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# モジュール共通の乱数生成器（起動時に1回だけ os.urandom でシード）
+_rng = random.Random(secrets.token_bytes(32))
+
 class SecureRandom:
-    """暗号学的に安全なランダム関数を提供するクラス（既存互換性維持）"""
+    """ランダム関数を提供するクラス（既存互換性維持・共通 random.Random に委譲）"""
     
     @staticmethod
     def choice(sequence: List[Any]) -> Any:
-        """リストから暗号学的に安全にランダム選択"""
+        """リストからランダム選択"""
         if not sequence:
             raise ValueError("空のシーケンスからは選択できません")
-        return sequence[secrets.randbelow(len(sequence))]
+        return _rng.choice(sequence)
     
     @staticmethod
     def randint(min_val: int, max_val: int) -> int:
-        """指定範囲内で暗号学的に安全にランダムな整数を生成"""
+        """指定範囲内でランダムな整数を生成"""
         if min_val > max_val:
             raise ValueError("最小値が最大値より大きいです")
-        return min_val + secrets.randbelow(max_val - min_val + 1)
+        return _rng.randint(min_val, max_val)
     
     @staticmethod
     def random() -> float:
-        """0.0以上1.0未満の暗号学的に安全なランダム浮動小数点数を生成"""
-        return secrets.randbelow(2**32) / (2**32)
+        """0.0以上1.0未満のランダム浮動小数点数を生成"""
+        return _rng.random()
     
     @staticmethod
     def shuffle(sequence: List[Any]) -> List[Any]:
-        """リストを暗号学的に安全にシャッフル（Fisher-Yatesアルゴリズム）"""
+        """リストをシャッフルしたコピーを返す（Fisher-Yatesアルゴリズム）"""
         shuffled = sequence.copy()
-        for i in range(len(shuffled) - 1, 0, -1):
-            j = secrets.randbelow(i + 1)
-            shuffled[i], shuffled[j] = shuffled[j], shuffled[i]
+        _rng.shuffle(shuffled)
         return shuffled
 
 class EnhancedSecureRandom:
     """
     拡張セキュアランダムクラス（重複回避＆重み付き選択）
     - 非ハッシュ対象(dict, list 等)を安全にハッシュ可能なキーへ変換して履歴・カウンターに保存
+    - 使用回数はカテゴリ別に「キー → 連番ID」を割り当て、int 配列で管理
     """
     
+    # 重複回避の履歴ウィンドウ（既定値）
+    HISTORY_MAXLEN = 3
+    
     def __init__(self):
-        self.rng = secrets.SystemRandom()
+        self.rng = random.Random(secrets.token_bytes(32))
         self.histories: Dict[str, deque] = {}
-        self.counters: Dict[str, Counter] = {}
+        self.option_ids: Dict[str, Dict[Any, int]] = {}
+        self.counts: Dict[str, array] = {}
     
     @staticmethod
     def _to_hashable(item):
         """
-        Counter / set のキーに安全に使える形へ変換する
+        カウンター / set のキーに安全に使える形へ変換する
         - 既にハッシュ可能ならそのまま
-        - dict / list などは json.dumps(sort_keys=True) で安定化
+        - dict / list などは orjson / json.dumps（キーソート）で安定化
         """
         try:
             hash(item)
             return item
         except TypeError:
             # dict 以外の list・set 等も文字列化で対応
+            # キーは履歴・カウンターで繰り返し比較されるため intern
+            if isinstance(item, (dict, list)) and ORJSON_AVAILABLE:
+                return sys.intern(orjson.dumps(item, option=orjson.OPT_SORT_KEYS).decode('utf-8'))
             if isinstance(item, (dict, list, set)):
-                return json.dumps(item, ensure_ascii=False, sort_keys=True)
-            return str(item)
+                return sys.intern(json.dumps(item, ensure_ascii=False, sort_keys=True))
+            return sys.intern(str(item))
     
-    def choice_no_repeat(self, sequence, category: str = "default", window: int = 3):
+    def choice_no_repeat(self, sequence, category: str = "default", window: int = HISTORY_MAXLEN):
         """
         直近 window 回に出ていない要素を優先しつつランダム選択
         - 低出現回数ほど選ばれやすい重みを付与
@@ -79,44 +101,62 @@ class EnhancedSecureRandom:
         # カテゴリ別履歴・カウンタ初期化
         if category not in self.histories:
             self.histories[category] = deque(maxlen=window)
-            self.counters[category] = Counter()
+            self.option_ids[category] = {}
+            self.counts[category] = array('i')
+        elif self.histories[category].maxlen != window:
+            # ウィンドウ変更時のみ既存履歴から1回で再構築（黙って切り詰めない）
+            self.histories[category] = deque(self.histories[category], maxlen=window)
         
         history = self.histories[category]
-        counter = self.counters[category]
+        option_ids = self.option_ids[category]
+        counts = self.counts[category]
         
-        # 「履歴にないもの」を候補に
-        candidates = [item for item in sequence 
-                      if self._to_hashable(item) not in history]
+        # ハッシュ化キーは1回だけ計算して候補と並行管理
+        seq_keys = [self._to_hashable(item) for item in sequence]
+        history_set = set(history)
+        
+        # 「履歴にないもの」を候補に（初出のキーには連番IDを割り当て）
+        candidates = []
+        cand_keys = []
+        cand_ids = []
+        for item, k in zip(sequence, seq_keys):
+            option_id = option_ids.get(k)
+            if option_id is None:
+                option_id = option_ids[k] = len(counts)
+                counts.append(0)
+            if k not in history_set:
+                candidates.append(item)
+                cand_keys.append(k)
+                cand_ids.append(option_id)
         
         # 全て履歴にある場合は履歴クリア
         if not candidates:
             history.clear()
-            candidates = sequence
+            candidates = list(sequence)
+            cand_keys = seq_keys
+            cand_ids = [option_ids[k] for k in seq_keys]
         
         # 使用頻度に応じた重み計算
         if len(candidates) > 1:
-            min_cnt = min(counter.get(self._to_hashable(x), 0) for x in candidates)
-            weights = [
-                max(1, min_cnt + 5 - counter.get(self._to_hashable(x), 0))
-                for x in candidates
-            ]
-            selected = self.rng.choices(candidates, weights=weights, k=1)[0]
+            cand_counts = [counts[i] for i in cand_ids]
+            min_cnt = min(cand_counts)
+            # 累積重み + 二分探索で1件選択（random.choices と同等の手順を直接実行）
+            cum_weights = list(accumulate(max(1, min_cnt + 5 - c) for c in cand_counts))
+            idx = bisect(cum_weights, self.rng.random() * cum_weights[-1])
         else:
-            selected = candidates[0]
+            idx = 0
+        selected = candidates[idx]
         
         # 履歴・カウンターを更新（ハッシュ化キーで管理）
-        key = self._to_hashable(selected)
-        history.append(key)
-        counter[key] += 1
+        history.append(cand_keys[idx])
+        counts[cand_ids[idx]] += 1
         
         return selected
     
     def shuffle_pool(self, sequence):
         """ Fisher-Yates シャッフル """
         shuffled = sequence.copy()
-        for i in range(len(shuffled) - 1, 0, -1):
-            j = self.rng.randbelow(i + 1)
-            shuffled[i], shuffled[j] = shuffled[j], shuffled[i]
+        self.rng.shuffle(shuffled)
         return shuffled
     
     def get_usage_stats(self, category: Optional[str] = None):
@@ -125,5 +165,12 @@ class EnhancedSecureRandom:
         - category 指定なしで全カテゴリ集計
         """
         if category:
-            return dict(self.counters.get(category, {}))
-        return {cat: dict(cnt) for cat, cnt in self.counters.items()}
\ No newline at end of file
+            return self._category_stats(category)
+        return {cat: self._category_stats(cat) for cat in self.option_ids}
+    
+    def _category_stats(self, category: str) -> dict:
+        """カテゴリの使用回数を {キー: 回数} 形式に変換（未使用キーは含めない）"""
+        counts = self.counts.get(category)
+        if counts is None:
+            return {}
+        return {k: counts[i] for k, i in self.option_ids[category].items() if counts[i]}
\ No newline at end of file
@@ -6,13 +6,35 @@ MetadataConverter - ローカルメタデータ→AWS用変換（11スロット
 リファクタリング前の全機能を再現 + S3からスロット情報を動的取得
 """
 
+import re
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 from common.logger import ColorLogger
 from common.config_manager import ConfigManager
+from .type_converter import float_to_decimal
 
 JST = timezone(timedelta(hours=9))
 
+# created_at の日時部分（ISO 形式 YYYY-MM-DDTHH:MM:SS、またはジェネレーター出力の YYYYmmddHHMMSS）
+# 時分秒まで揃った値のみ対象、オフセットは変換せずそのまま使う（この場合に限り fromisoformat + strftime と同じ結果）
+# 日付のみ・分までの値などは fromisoformat で解析する
+_CREATED_AT_PATTERN = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})[T ]?(\d{2}):?(\d{2}):?(\d{2})")
+
+def _to_decimal(value):
+    """数値を DynamoDB 用 Decimal に変換（変換できない値はそのまま返す）"""
+    if isinstance(value, (Decimal, bool)):
+        return value
+    if isinstance(value, float):
+        return float_to_decimal(value)
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, str):
+        try:
+            return Decimal(value)
+        except ArithmeticError:
+            return value
+    return value
+
 class MetadataConverter:
     """メタデータ変換クラス（11スロット対応・S3動的取得版）"""
 
@@ -43,6 +65,10 @@ class MetadataConverter:
                 "late_night", "mid_night", "general"
             ]
 
+        # 画像ごとに変わらない値は初期化時に1回だけ決定
+        self._suitable_slots = self.get_suitable_time_slots()
+        self._slot_config_version = self._get_slot_config_version()
+
     def get_suitable_time_slots(self):
         """
         適合時間帯スロットを取得（S3動的取得またはフォールバック）
@@ -76,22 +102,25 @@ class MetadataConverter:
 
         # 基本情報取得（既存機能保持）
         genre = local_metadata['genre']
-        created_at_iso = local_metadata.get('created_at', datetime.now().isoformat())
+        created_at = local_metadata.get('created_at')
 
-        # created_atから日時文字列生成（既存機能保持）
-        try:
-            dt = datetime.fromisoformat(created_at_iso.replace('Z', '+00:00'))
-            created_at_string = dt.strftime("%Y%m%d%H%M%S")
-        except:
-            created_at_string = datetime.now().strftime("%Y%m%d%H%M%S")
+        # created_atから日時文字列生成（時分秒まで揃った値は数字部分を連結、それ以外は fromisoformat、解析できない場合は現在時刻）
+        match = _CREATED_AT_PATTERN.match(created_at) if isinstance(created_at, str) else None
+        if match:
+            created_at_string = "".join(match.groups())
+        else:
+            try:
+                created_at_string = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime("%Y%m%d%H%M%S")
+            except (AttributeError, TypeError, ValueError):
+                created_at_string = datetime.now().strftime("%Y%m%d%H%M%S")
 
         # S3キー生成（既存機能保持）
         s3_key = f"image-pool/{genre}/{new_id}.png"
 
         # ===============================================
-        # 11スロット対応：S3から動的に適合時間帯スロットを取得
+        # 11スロット対応：初期化時に S3 から取得した適合時間帯スロット（画像ごとに複製）
         # ===============================================
-        suitable_slots = self.get_suitable_time_slots()
+        suitable_slots = list(self._suitable_slots)
 
         # DynamoDBアイテム構築（既存機能保持 + 11スロット対応フィールド追加）
         aws_metadata = {
@@ -105,7 +134,7 @@ class MetadataConverter:
             # --- 11スロット対応フィールド（S3から動的取得） ---
             "suitableTimeSlots": suitable_slots,
             "recommendedTimeSlot": "general",  # デフォルト値、後で更新される
-            "slotConfigVersion": self._get_slot_config_version(),  # S3設定バージョン情報
+            "slotConfigVersion": self._slot_config_version,  # S3設定バージョン情報
             # --- 既存フィールド（完全保持） ---
             "preGeneratedComments": {},
             "commentGeneratedAt": "",
@@ -138,17 +167,6 @@ class MetadataConverter:
 
     def extract_sd_params(self, local_metadata):
         """SDパラメータ抽出（既存機能完全保持）"""
-        def safe_decimal_convert(value):
-            """float値をDecimalに安全に変換"""
-            if isinstance(value, float):
-                return Decimal(str(value))
-            elif isinstance(value, (int, str)):
-                try:
-                    return Decimal(str(value))
-                except:
-                    return value
-            return value
-
         sd_params = {}
 
         # ベースパラメータ（既存機能保持）
@@ -170,7 +188,7 @@ class MetadataConverter:
                 'prompt': sdxl_gen.get('prompt', ''),
                 'negative_prompt': sdxl_gen.get('negative_prompt', ''),
                 'steps': int(sdxl_gen.get('steps', 30)),
-                'cfg_scale': safe_decimal_convert(sdxl_gen.get('cfg_scale', 7.0)),
+                'cfg_scale': _to_decimal(sdxl_gen.get('cfg_scale', 7.0)),
                 'width': int(sdxl_gen.get('width', 896)),
                 'height': int(sdxl_gen.get('height', 1152)),
                 'model': sdxl_gen.get('model', ''),
@@ -180,15 +198,17 @@ class MetadataConverter:
         # ControlNetパラメータ（Decimal型対応）（既存機能保持）
         if 'controlnet' in local_metadata:
             cn = local_metadata['controlnet']
+            openpose = cn.get('openpose') or {}
+            depth = cn.get('depth') or {}
             sd_params['controlnet'] = {
                 'enabled': cn.get('enabled', False),
                 'openpose': {
-                    'enabled': cn.get('openpose', {}).get('enabled', False),
-                    'weight': safe_decimal_convert(cn.get('openpose', {}).get('weight', 0.8))
+                    'enabled': openpose.get('enabled', False),
+                    'weight': _to_decimal(openpose.get('weight', 0.8))
                 },
                 'depth': {
-                    'enabled': cn.get('depth', {}).get('enabled', False),
-                    'weight': safe_decimal_convert(cn.get('depth', {}).get('weight', 0.3))
+                    'enabled': depth.get('enabled', False),
+                    'weight': _to_decimal(depth.get('weight', 0.3))
                 }
             }
 
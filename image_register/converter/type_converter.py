@@ -7,8 +7,17 @@ Float型をDecimal型に変換してDynamoDB互換性を確保
 """
 
 from decimal import Decimal
+from functools import lru_cache
 from common.logger import ColorLogger
 
+@lru_cache(maxsize=4096)
+def float_to_decimal(value: float) -> Decimal:
+    """
+    float を Decimal に変換（str 経由で 2進誤差を持ち込まない）
+    - cfg_scale・weight など同じ値が画像間で繰り返されるため、変換結果（不変）を使い回す
+    """
+    return Decimal(str(value))
+
 class TypeConverter:
     """型変換クラス（完全版）"""
 
@@ -22,7 +31,7 @@ class TypeConverter:
     def _safe_convert_numeric(self, value):
         """数値を安全にDynamoDB対応型に変換"""
         if isinstance(value, float):
-            return Decimal(str(value))
+            return float_to_decimal(value)
         elif isinstance(value, dict):
             return {k: self._safe_convert_numeric(v) for k, v in value.items()}
         elif isinstance(value, list):
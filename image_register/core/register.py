@@ -11,13 +11,15 @@ import json
 import yaml
 import boto3
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from decimal import Decimal
 
 from common.logger import ColorLogger
-from common.config_manager import ConfigManager
+from common.config_manager import ConfigManager, YamlLoader
 from common.aws_client import AWSClientManager
 
 # 相対インポート
@@ -25,7 +27,7 @@ from ..scanner.file_scanner import FileScanner
 from ..converter.metadata_converter import MetadataConverter
 from ..converter.type_converter import TypeConverter
 from ..uploader.s3_uploader import S3Uploader
-from ..uploader.dynamodb_uploader import DynamoDBUploader
+from ..uploader.dynamodb_uploader import DynamoDBUploader, DYNAMODB_BATCH_SIZE
 from ..processor.batch_processor import BatchProcessor
 
 # BedrockManagerのインポート（新規追加）
@@ -90,6 +92,7 @@ class HybridBijoRegisterV9:
 
         # 設定読み込み
         self.config = self.load_config(config_path)
+        self.logger.detailed = self.config.get('logging', {}).get('detailed_progress', True)
 
         # AWS クライアント初期化
         self.setup_aws_clients()
@@ -97,6 +100,23 @@ class HybridBijoRegisterV9:
         # BedrockManager初期化（新規追加）
         self.setup_bedrock_manager()
 
+        self.s3_bucket = self.config['aws']['s3_bucket']
+
+        # メタデータ変換（投稿スケジュール設定の S3 取得・YAML 解析は初期化時の1回のみ）
+        self.metadata_converter = MetadataConverter(self.logger)
+        self.type_converter = TypeConverter(self.logger)
+
+        # ペアごとのネットワーク処理（Bedrockコメント生成・S3アップロード）を並行実行するワーカー
+        self.max_concurrent_items = self.config.get('processing', {}).get('max_concurrent_items', 8)
+        self._io_executor = ThreadPoolExecutor(max_workers=self.max_concurrent_items,
+                                               thread_name_prefix="register_io")
+
+        # Lambda が一括コメント生成（all_timeslots_batch）に対応しているか（応答なしで False）
+        self._bedrock_batch_supported = True
+
+        # 登録済みと確認できた imageId（重複チェックの再問い合わせを省く、プロセス内のみ保持）
+        self._registered_ids = set()
+
         # 統計情報
         self.stats = {
             'total_found': 0,
@@ -112,7 +132,7 @@ class HybridBijoRegisterV9:
         """設定ファイル読み込み"""
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=YamlLoader)
             self.logger.print_success(f"✅ 設定ファイル読み込み完了: {config_path}")
             return config
         except FileNotFoundError:
@@ -126,12 +146,23 @@ class HybridBijoRegisterV9:
         """AWSクライアント初期化"""
         aws_config = self.config['aws']
         try:
-            self.s3_client = boto3.client('s3', region_name=aws_config['region'])
-            self.dynamodb = boto3.resource('dynamodb', region_name=aws_config['region'])
+            # 固定の待機ではなく、スロットリング時のみ SDK 側で待機・再試行（adaptive モード）
+            # 接続プールは同時実行数 × S3 マルチパートの並列数を賄える大きさにし、TCP keep-alive で接続を再利用
+            concurrency = self.config.get('processing', {}).get('max_concurrent_items', 8)
+            boto_config = Config(
+                retries={'max_attempts': 5, 'mode': 'adaptive'},
+                read_timeout=180,
+                connect_timeout=10,
+                max_pool_connections=max(10, concurrency * 4),
+                tcp_keepalive=True
+            )
+
+            self.s3_client = boto3.client('s3', region_name=aws_config['region'], config=boto_config)
+            self.dynamodb = boto3.resource('dynamodb', region_name=aws_config['region'], config=boto_config)
             self.dynamodb_table = self.dynamodb.Table(aws_config['dynamodb_table'])
             
             if self.config['bedrock']['enabled']:
-                self.lambda_client = boto3.client('lambda', region_name=aws_config['region'])
+                self.lambda_client = boto3.client('lambda', region_name=aws_config['region'], config=boto_config)
                 self.logger.print_status("🤖 Bedrock Lambda クライアント初期化完了")
             
             self.logger.print_success(f"✅ AWS接続完了: {aws_config['region']}")
@@ -178,26 +209,18 @@ class HybridBijoRegisterV9:
         # BedrockManagerを使用（推奨方式）
         if self.bedrock_manager:
             try:
-                self.logger.print_status("🤖 BedrockManager経由でコメント生成中...")
+                if self.logger.detailed:
+                    self.logger.print_status("🤖 BedrockManager経由でコメント生成中...")
                 
                 # BedrockManager用メタデータ準備
-                bedrock_metadata = {
-                    'genre': image_metadata.get('genre', ''),
-                    'style': 'general',
-                    'imageId': image_metadata.get('imageId', ''),
-                    'prompt': image_metadata.get('sdParams', {}).get('sdxl_unified', {}).get('prompt', ''),
-                    'pose_mode': image_metadata.get('sdParams', {}).get('base', {}).get('pose_mode', 'detection')
-                }
-                
-                # API制限対策
-                time.sleep(1)
+                bedrock_metadata = self._build_bedrock_metadata(image_metadata)
                 
-                # BedrockManagerに委譲
+                # BedrockManagerに委譲（API制限は lambda クライアントの adaptive リトライで吸収）
                 comments = self.bedrock_manager.generate_all_timeslot_comments(bedrock_metadata)
                 
                 if comments:
-                    self.logger.print_success(f"🤖 BedrockManager経由でコメント生成完了: {len(comments)}件")
-                    time.sleep(2)
+                    if self.logger.detailed:
+                        self.logger.print_success(f"🤖 BedrockManager経由でコメント生成完了: {len(comments)}件")
                     return comments
                 else:
                     self.logger.print_warning("⚠️ BedrockManagerでコメント生成失敗、従来方式を試行")
@@ -212,6 +235,33 @@ class HybridBijoRegisterV9:
             # 従来方式を実行
             return self._generate_bedrock_comments_legacy(image_metadata)
 
+    @staticmethod
+    def _build_bedrock_metadata(image_metadata):
+        """BedrockManager に渡すメタデータ"""
+        return {
+            'genre': image_metadata.get('genre', ''),
+            'style': 'general',
+            'imageId': image_metadata.get('imageId', ''),
+            'prompt': image_metadata.get('sdParams', {}).get('sdxl_unified', {}).get('prompt', ''),
+            'pose_mode': image_metadata.get('sdParams', {}).get('base', {}).get('pose_mode', 'detection')
+        }
+
+    def generate_bedrock_comments_batch(self, metadata_list):
+        """
+        チャンク内の画像のBedrockコメントを1回のLambda呼び出しでまとめて生成
+        - 戻り値: imageId → コメント辞書（一括応答に含まれた画像のみ、残りは呼び出し側で1件ずつ生成）
+        - 一括応答が空の場合は一括モード非対応とみなし、以降のチャンクでは呼び出さない
+        """
+        if not (self.config['bedrock']['enabled'] and self.bedrock_manager
+                and self._bedrock_batch_supported and metadata_list):
+            return {}
+        results = self.bedrock_manager.generate_all_timeslot_comments_batch(
+            [self._build_bedrock_metadata(m) for m in metadata_list])
+        if not results:
+            self.logger.print_warning("⚠️ Bedrock一括生成の応答なし、以降は1件ずつ生成します")
+            self._bedrock_batch_supported = False
+        return results
+
     def _generate_bedrock_comments_legacy(self, image_metadata):
         """従来のBedrockコメント生成方式（フォールバック用）"""
         try:
@@ -226,9 +276,6 @@ class HybridBijoRegisterV9:
                 'pose_mode': image_metadata.get('sdParams', {}).get('base', {}).get('pose_mode', 'detection')
             }
 
-            # API制限対策
-            time.sleep(1)
-
             response = self.lambda_client.invoke(
                 FunctionName=self.config['bedrock']['lambda_function_name'],
                 InvocationType='RequestResponse',
@@ -244,7 +291,6 @@ class HybridBijoRegisterV9:
             if body.get('success'):
                 comments = body.get('all_comments', {})
                 self.logger.print_success(f"🤖 従来方式でBedrockコメント生成完了: {len(comments)}件")
-                time.sleep(2)
                 return comments
             else:
                 self.logger.print_warning(f"⚠️ 従来方式でBedrockコメント生成失敗: {body.get('error')}")
@@ -263,75 +309,140 @@ class HybridBijoRegisterV9:
 
     def process_single_pair(self, image_path: str, metadata_path: str) -> bool:
         """単一ペア処理（完全版 + BedrockManager対応）"""
-        try:
-            # 1. メタデータ読み込み・検証
-            scanner = FileScanner(self.logger)
-            local_metadata = scanner.load_and_validate_metadata(metadata_path)
-            if not local_metadata:
+        return self.process_pairs([(image_path, metadata_path)]) > 0
+
+    def _load_aws_metadata(self, scanner: FileScanner, metadata_path: str):
+        """メタデータ読み込み・検証とAWS用変換（失敗時は None）"""
+        local_metadata = scanner.load_and_validate_metadata(metadata_path)
+        if not local_metadata:
+            return None
+
+        aws_metadata = self.metadata_converter.convert_metadata_for_aws(local_metadata)
+        aws_metadata = self.type_converter.convert_for_dynamodb(aws_metadata)
+
+        # S3バケット名を設定に合わせて更新
+        aws_metadata['s3Bucket'] = self.s3_bucket
+        return aws_metadata
+
+    def process_pairs(self, pairs, offset: int = 0, total: int = None) -> int:
+        """
+        ペア群の処理（DYNAMODB_BATCH_SIZE 件ずつ）
+        - 重複チェックは BatchGetItem 1回、DynamoDB 登録は BatchWriteItem 1回にまとめる
+        - Bedrockコメントはチャンク分を1回の Lambda 呼び出しで一括生成（応答に含まれない分と S3 アップロードは最大 max_concurrent_items 件を並行実行）
+        - S3 アップロード成功分のみ登録し、登録できたものだけローカルファイルを削除
+        Returns: 成功件数
+        """
+        total = total or len(pairs)
+        success = 0
+        for start in range(0, len(pairs), DYNAMODB_BATCH_SIZE):
+            success += self._process_chunk(pairs[start:start + DYNAMODB_BATCH_SIZE], offset + start, total)
+        return success
+
+    def _process_chunk(self, chunk, offset: int, total: int) -> int:
+        """DYNAMODB_BATCH_SIZE 件以下のペアを処理（process_pairs 参照）"""
+        scanner = FileScanner(self.logger)
+        dbu = DynamoDBUploader(self.dynamodb_table, self.logger)
+        s3u = S3Uploader(self.s3_client, self.s3_bucket, self.logger)
+
+        # 1. メタデータ読み込み・変換（ファイル読み込みを並行実行）
+        load_futures = [self._io_executor.submit(self._load_aws_metadata, scanner, metadata_path)
+                        for _, metadata_path in chunk]
+        prepared = []
+        for (image_path, metadata_path), future in zip(chunk, load_futures):
+            try:
+                aws_metadata = future.result()
+            except Exception as e:
+                self.logger.print_error(f"❌ 処理エラー: {e}")
+                aws_metadata = None
+            if aws_metadata is None:
                 self.stats['errors'] += 1
-                return False
+                continue
+            prepared.append((image_path, metadata_path, aws_metadata))
+
+        # 2. 重複チェック（登録済みと分かっている ID は問い合わせず、残りをまとめて取得）
+        chunk_ids = [m['imageId'] for _, _, m in prepared]
+        existing_ids = {image_id for image_id in chunk_ids if image_id in self._registered_ids}
+        found_ids = dbu.fetch_existing_ids([image_id for image_id in chunk_ids if image_id not in existing_ids])
+        self._registered_ids |= found_ids
+        existing_ids |= found_ids
+
+        # 3. Bedrockコメント生成（チャンク分を1回で一括生成）・S3アップロード（ペアごとに並行実行）
+        to_upload = []
+        for i, (image_path, metadata_path, aws_metadata) in enumerate(prepared, offset + 1):
+            image_id = aws_metadata['imageId']
+            if self.logger.detailed:
+                self.logger.print_status(f"\n--- {i}/{total} ---")
+                self.logger.print_status(f"🔄 処理中: {image_id}")
+
+            if image_id in existing_ids:
+                self.logger.print_warning(f"⚠️ 既存画像のため登録スキップ: {image_id}")
+                self.stats['duplicates'] += 1
+                continue
+            # 同一チャンク内の同じ imageId も重複として扱う
+            existing_ids.add(image_id)
 
-            # 2. AWS用メタデータ変換
-            converter = MetadataConverter(self.logger)
-            type_conv = TypeConverter(self.logger)
-            aws_metadata = converter.convert_metadata_for_aws(local_metadata)
-            aws_metadata = type_conv.convert_for_dynamodb(aws_metadata)
+            to_upload.append((image_path, metadata_path, aws_metadata))
 
-            # S3バケット名を設定に合わせて更新
-            aws_metadata['s3Bucket'] = self.config['aws']['s3_bucket']
-            
-            image_id = aws_metadata['imageId']
-            s3_key = aws_metadata['s3Key']
-            
-            self.logger.print_status(f"🔄 処理中: {image_id}")
+        # 一括応答に含まれなかった画像はワーカー内で1件ずつ生成
+        batch_comments = self.generate_bedrock_comments_batch([m for _, _, m in to_upload])
+        pending = []
+        for entry in to_upload:
+            image_path, _, aws_metadata = entry
+            pending.append((entry, self._io_executor.submit(self._upload_pair, s3u, image_path, aws_metadata,
+                                                            batch_comments.get(aws_metadata['imageId']))))
 
-            # 3. DynamoDB登録（重複チェック付き）
-            dbu = DynamoDBUploader(self.dynamodb_table, self.logger)
-            
-            # 重複チェック
+        uploaded = []
+        for entry, future in pending:
             try:
-                existing_item = self.dynamodb_table.get_item(Key={'imageId': image_id})
-                if 'Item' in existing_item:
-                    self.logger.print_warning(f"⚠️ 既存画像のため登録スキップ: {image_id}")
-                    self.stats['duplicates'] += 1
-                    return False
-            except:
-                pass
-
-            # Bedrockコメント生成（BedrockManager対応）
-            bedrock_comments = self.generate_bedrock_comments(aws_metadata)
-            if bedrock_comments:
-                aws_metadata['preGeneratedComments'] = bedrock_comments
-                aws_metadata['commentGeneratedAt'] = datetime.now(JST).isoformat()
-
-            if not dbu.register_to_dynamodb(aws_metadata):
-                self.stats['errors'] += 1
-                return False
-
-            # 4. S3アップロード
-            s3u = S3Uploader(self.s3_client, self.config['aws']['s3_bucket'], self.logger)
-            if not s3u.upload_to_s3(image_path, s3_key):
-                # S3失敗時はDynamoDBから削除
-                try:
-                    self.dynamodb_table.delete_item(Key={'imageId': image_id})
-                    self.logger.print_status(f"🧹 DynamoDB削除完了: {image_id}")
-                except Exception as cleanup_error:
-                    self.logger.print_warning(f"⚠️ DynamoDB削除エラー: {cleanup_error}")
+                ok = future.result()
+            except Exception as e:
+                self.logger.print_error(f"❌ 処理エラー: {e}")
+                ok = False
+            if ok:
+                uploaded.append(entry)
+            else:
                 self.stats['errors'] += 1
-                return False
 
-            # 5. ローカルファイル削除
-            if self.config.get('processing', {}).get('cleanup_local_files_on_success', False):
-                scanner.cleanup_local_files(image_path, metadata_path)
+        if not uploaded:
+            return 0
 
+        # 4. DynamoDB一括登録
+        failed_ids = dbu.register_batch_to_dynamodb([m for _, _, m in uploaded])
+
+        # 5. ローカルファイル削除（削除はワーカーで並行実行し、チャンク終了前に完了を待つ）
+        cleanup = self.config.get('processing', {}).get('cleanup_local_files_on_success', False)
+        cleanup_futures = []
+        success = 0
+        for image_path, metadata_path, aws_metadata in uploaded:
+            image_id = aws_metadata['imageId']
+            if image_id in failed_ids:
+                self.stats['errors'] += 1
+                continue
+            self._registered_ids.add(image_id)
+            if cleanup:
+                cleanup_futures.append(self._io_executor.submit(scanner.cleanup_local_files,
+                                                                image_path, metadata_path))
             self.stats['success'] += 1
-            self.logger.print_success(f"✅ 処理完了: {image_id}")
-            return True
+            success += 1
+            if self.logger.detailed:
+                self.logger.print_success(f"✅ 処理完了: {image_id}")
+        # cleanup_local_files は例外を内部で処理するため、完了のみ待つ
+        for future in cleanup_futures:
+            future.result()
+        return success
+
+    def _upload_pair(self, s3u: S3Uploader, image_path: str, aws_metadata: dict,
+                     bedrock_comments: dict = None) -> bool:
+        """Bedrockコメント生成と S3 アップロード（ワーカースレッドで実行、一括生成済みのコメントがあればそれを使用）"""
+        # Bedrockコメント生成（BedrockManager対応）
+        if not bedrock_comments:
+            bedrock_comments = self.generate_bedrock_comments(aws_metadata)
+        if bedrock_comments:
+            aws_metadata['preGeneratedComments'] = bedrock_comments
+            aws_metadata['commentGeneratedAt'] = datetime.now(JST).isoformat()
 
-        except Exception as e:
-            self.logger.print_error(f"❌ 処理エラー: {e}")
-            self.stats['errors'] += 1
-            return False
+        # S3アップロード（成功分のみ DynamoDB に登録するため、失敗時のロールバックは不要）
+        return s3u.upload_to_s3(image_path, aws_metadata['s3Key'])
 
     def process_batch(self, genre: str) -> int:
         """バッチ処理（完全版 + BedrockManager対応）"""
@@ -364,19 +475,8 @@ class HybridBijoRegisterV9:
         timer = ProcessTimer(self.logger)
         timer.start(f"{genre} バッチ処理")
 
-        # 各ペア処理
-        for i, (image_path, metadata_path) in enumerate(pairs, 1):
-            self.logger.print_status(f"\n--- {i}/{len(pairs)} ---")
-            
-            success = self.process_single_pair(image_path, metadata_path)
-            
-            if not success and self.config['processing']['skip_on_individual_errors']:
-                self.logger.print_status("⏭️ エラーをスキップして継続")
-                continue
-
-            # API制限対策：処理間隔
-            if i < len(pairs):
-                time.sleep(self.config.get('processing', {}).get('delay_between_items', 1))
+        # 各ペア処理（個別エラーはスキップして継続、DynamoDB 登録は25件ごとにまとめて送信）
+        self.process_pairs(pairs)
 
         timer.end_and_report(self.stats['success'])
         self.print_final_summary()
@@ -8,10 +8,18 @@ FileScanner - ファイルスキャン・ペア管理（強化版）
 
 import os
 import json
-from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 from common.logger import ColorLogger
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# メタデータ必須フィールド（値が空の場合も欠損扱い）
+REQUIRED_METADATA_FIELDS = ('image_id', 'genre', 'generation_mode')
+
 class FileScanner:
     """ディレクトリスキャン・ペア管理クラス（完全版）"""
     
@@ -26,18 +34,31 @@ class FileScanner:
             self.logger.print_error(f"❌ ディレクトリが存在しません: {directory_path}")
             return []
         
-        pairs = []
         supported_formats = ['png', 'jpg', 'jpeg']
         
+        # ディレクトリを1回だけ読み、拡張子の判定とメタデータの有無はファイル名だけで行う（追加の stat なし）
+        with os.scandir(directory_path) as it:
+            file_names = [entry.name for entry in it
+                          if not entry.name.startswith('.') and entry.is_file()]
+        name_set = set(file_names)
+        
+        images_by_format = {ext: [] for ext in supported_formats}
+        for name in file_names:
+            stem, dot, ext = name.rpartition('.')
+            if dot and ext in images_by_format:
+                images_by_format[ext].append((name, stem))
+        
+        pairs = []
         for ext in supported_formats:
-            for image_path in Path(directory_path).glob(f"*.{ext}"):
+            for image_name, base_name in images_by_format[ext]:
                 # 修正：_metadata.json形式に対応
-                base_name = image_path.stem  # 拡張子なしのファイル名
-                metadata_path = image_path.parent / f"{base_name}_metadata.json"
+                metadata_name = f"{base_name}_metadata.json"
                 
-                if metadata_path.exists():
-                    pairs.append((str(image_path), str(metadata_path)))
-                    self.logger.print_status(f"🔍 ペア検出: {image_path.name} + {metadata_path.name}")
+                if metadata_name in name_set:
+                    pairs.append((os.path.join(directory_path, image_name),
+                                  os.path.join(directory_path, metadata_name)))
+                    if self.logger.detailed:
+                        self.logger.print_status(f"🔍 ペア検出: {image_name} + {metadata_name}")
         
         self.logger.print_success(f"✅ {len(pairs)}ペアの画像+JSONファイルを検出")
         return pairs
@@ -45,16 +66,13 @@ class FileScanner:
     def load_and_validate_metadata(self, metadata_path: str) -> Optional[Dict[str, Any]]:
         """メタデータ読み込み・検証（完全版）"""
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
+            # バイト列のまま読み込み、orjson があれば直接デコード
+            with open(metadata_path, 'rb') as f:
+                data = f.read()
+            metadata = orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
             
             # 必須フィールドチェック
-            required_fields = ['image_id', 'genre', 'generation_mode']
-            missing_fields = []
-            
-            for field in required_fields:
-                if field not in metadata or not metadata[field]:
-                    missing_fields.append(field)
+            missing_fields = [field for field in REQUIRED_METADATA_FIELDS if not metadata.get(field)]
             
             if missing_fields:
                 self.logger.print_warning(f"⚠️ 不足フィールド: {missing_fields}")
@@ -128,6 +146,7 @@ class FileScanner:
         try:
             os.remove(image_path)
             os.remove(metadata_path)
-            self.logger.print_status(f"🗑️ ローカルファイル削除完了: {os.path.basename(image_path)}")
+            if self.logger.detailed:
+                self.logger.print_status(f"🗑️ ローカルファイル削除完了: {os.path.basename(image_path)}")
         except Exception as e:
             self.logger.print_warning(f"⚠️ ローカルファイル削除エラー: {e}")
@@ -7,6 +7,7 @@ DynamoDBUploader - DynamoDB登録機能（完全版）
 
 from botocore.exceptions import ClientError
 from common.logger import ColorLogger
+from common.aws_client import DYNAMODB_BATCH_SIZE, send_dynamodb_batch
 
 class DynamoDBUploader:
     """DynamoDBアップローダー（完全版）"""
@@ -20,11 +21,13 @@ class DynamoDBUploader:
         image_id = aws_metadata['imageId']
         
         try:
-            self.logger.print_status(f"📝 DynamoDB登録中: {image_id}")
+            if self.logger.detailed:
+                self.logger.print_status(f"📝 DynamoDB登録中: {image_id}")
             
             # DynamoDB登録（boto3のResourceを使用）
             self.dynamodb_table.put_item(Item=aws_metadata)
-            self.logger.print_success(f"✅ DynamoDB登録完了: {image_id}")
+            if self.logger.detailed:
+                self.logger.print_success(f"✅ DynamoDB登録完了: {image_id}")
 
             return True
 
@@ -35,3 +38,67 @@ class DynamoDBUploader:
         except Exception as e:
             self.logger.print_error(f"❌ DynamoDB登録エラー ({image_id}): {e}")
             return False
+
+    def fetch_existing_ids(self, image_ids) -> set:
+        """
+        登録済み imageId を BatchGetItem でまとめて取得（重複チェック用）
+        - 1リクエスト最大 DYNAMODB_BATCH_SIZE 件、未処理キーは指数バックオフで再送
+        - 取得に失敗したキーは未登録として扱う（従来の get_item 失敗時と同じ）
+        """
+        existing = set()
+        table_name = self.dynamodb_table.name
+        client = self.dynamodb_table.meta.client
+        unique_ids = list(dict.fromkeys(image_ids))
+
+        for start in range(0, len(unique_ids), DYNAMODB_BATCH_SIZE):
+            request_items = {table_name: {
+                'Keys': [{'imageId': image_id} for image_id in unique_ids[start:start + DYNAMODB_BATCH_SIZE]],
+                'ProjectionExpression': 'imageId'
+            }}
+            try:
+                unprocessed = send_dynamodb_batch(
+                    client.batch_get_item, request_items, 'UnprocessedKeys',
+                    on_response=lambda response: existing.update(
+                        item['imageId'] for item in response.get('Responses', {}).get(table_name, [])))
+                if unprocessed:
+                    self.logger.print_warning("⚠️ 重複チェック未処理キーあり（未登録として続行）")
+            except Exception as e:
+                self.logger.print_warning(f"⚠️ 重複チェックエラー（未登録として続行）: {e}")
+
+        return existing
+
+    def register_batch_to_dynamodb(self, items) -> set:
+        """
+        DynamoDB 一括登録（BatchWriteItem、DYNAMODB_BATCH_SIZE 件ごと）
+        - 未処理アイテムは指数バックオフで再送し、残った分と一括送信エラーのチャンクは1件ずつ put_item で再登録
+        Returns: 登録できなかった imageId の集合（全件成功時は空）
+        """
+        failed = set()
+        table_name = self.dynamodb_table.name
+        client = self.dynamodb_table.meta.client
+
+        for start in range(0, len(items), DYNAMODB_BATCH_SIZE):
+            chunk = items[start:start + DYNAMODB_BATCH_SIZE]
+            self.logger.print_status(f"📝 DynamoDB一括登録中: {len(chunk)}件")
+            request_items = {table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+            try:
+                request_items = send_dynamodb_batch(client.batch_write_item, request_items, 'UnprocessedItems')
+                retry_items = [request['PutRequest']['Item'] for request in request_items.get(table_name, [])]
+            except ClientError as e:
+                # ValidationException など1件の不正でチャンク全体が拒否されるため、1件ずつ再登録して不正分のみ失敗にする
+                error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+                self.logger.print_warning(f"⚠️ DynamoDB一括登録エラー、1件ずつ再登録: {error_code}")
+                retry_items = chunk
+            except Exception as e:
+                # シリアライズエラー（NaN / Infinity の Decimal など）も同様
+                self.logger.print_warning(f"⚠️ DynamoDB一括登録エラー、1件ずつ再登録: {e}")
+                retry_items = chunk
+            for item in retry_items:
+                if not self.register_to_dynamodb(item):
+                    failed.add(item['imageId'])
+
+        if failed:
+            self.logger.print_error(f"❌ DynamoDB未登録: {len(failed)}件")
+        else:
+            self.logger.print_success(f"✅ DynamoDB一括登録完了: {len(items)}件")
+        return failed
@@ -5,15 +5,29 @@
 S3Uploader - S3アップロード機能（完全版）
 """
 
+import os
 from datetime import datetime, timezone, timedelta
-from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError, ParamValidationError
 from common.logger import ColorLogger
 
 JST = timezone(timedelta(hours=9))
 
+# 8MB 以上はマルチパート（パートを並列送信）、それ未満は1回の PUT
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_THRESHOLD,
+    max_concurrency=4,
+    use_threads=True
+)
+
 class S3Uploader:
     """S3アップローダー（完全版）"""
     
+    # 条件付き書き込み（IfNoneMatch）が使えるか（非対応の botocore と分かった時点でプロセス全体で False）
+    conditional_put_supported = True
+    
     def __init__(self, s3_client, bucket_name, logger):
         self.s3_client = s3_client
         self.bucket_name = bucket_name
@@ -22,33 +36,50 @@ class S3Uploader:
     def upload_to_s3(self, image_path: str, s3_key: str) -> bool:
         """S3アップロード（完全版）"""
         try:
-            self.logger.print_status(f"📤 S3アップロード中: {s3_key}")
+            if self.logger.detailed:
+                self.logger.print_status(f"📤 S3アップロード中: {s3_key}")
             
-            # 重複チェック
-            try:
-                self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
-                self.logger.print_warning(f"⚠️ S3に既存ファイルがあるためスキップ: {s3_key}")
-                return True  # 既に存在する場合は成功とみなす
-            except ClientError as e:
-                if e.response['Error']['Code'] != '404':
-                    raise  # 404以外のエラーは再度発生させる
-
-            # アップロード実行
-            with open(image_path, 'rb') as f:
-                self.s3_client.upload_fileobj(
-                    f,
-                    self.bucket_name,
-                    s3_key,
-                    ExtraArgs={
-                        'ContentType': 'image/png',
-                        'Metadata': {
-                            'upload-source': 'hybrid-bijo-register-v9',
-                            'upload-timestamp': datetime.now(JST).isoformat()
-                        }
-                    }
-                )
-
-            self.logger.print_success(f"✅ S3アップロード完了: {s3_key}")
+            extra_args = {
+                'ContentType': 'image/png',
+                'Metadata': {
+                    'upload-source': 'hybrid-bijo-register-v9',
+                    'upload-timestamp': datetime.now(JST).isoformat()
+                }
+            }
+
+            conditional_put = self.conditional_put_supported and os.path.getsize(image_path) < MULTIPART_THRESHOLD
+            if conditional_put:
+                # 条件付き書き込み（IfNoneMatch）で重複チェックとアップロードを1リクエストにまとめる
+                try:
+                    with open(image_path, 'rb') as f:
+                        self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=f,
+                                                  IfNoneMatch='*', **extra_args)
+                except ParamValidationError:
+                    # IfNoneMatch 非対応の botocore（S3 条件付き書き込み対応前）では従来方式に切り替える
+                    self.logger.print_warning("⚠️ botocore が IfNoneMatch 非対応のため、事前の重複チェック方式を使用")
+                    S3Uploader.conditional_put_supported = False
+                    conditional_put = False
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') != 'PreconditionFailed':
+                        raise
+                    self.logger.print_warning(f"⚠️ S3に既存ファイルがあるためスキップ: {s3_key}")
+                    return True  # 既に存在する場合は成功とみなす
+            if not conditional_put:
+                # マルチパート（または条件付き書き込み非対応時）は従来どおり事前に重複チェック
+                try:
+                    self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+                    self.logger.print_warning(f"⚠️ S3に既存ファイルがあるためスキップ: {s3_key}")
+                    return True  # 既に存在する場合は成功とみなす
+                except ClientError as e:
+                    if e.response['Error']['Code'] != '404':
+                        raise  # 404以外のエラーは再度発生させる
+
+                # アップロード実行（パス指定でパート単位に読み込み・送信）
+                self.s3_client.upload_file(image_path, self.bucket_name, s3_key,
+                                           ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
+
+            if self.logger.detailed:
+                self.logger.print_success(f"✅ S3アップロード完了: {s3_key}")
             return True
 
         except ClientError as e: